@@ -1,3 +1,26 @@
+import os
+
 workers = 4
 bind = "0.0.0.0:8000"
-module = "server.wsgi:application"
\ No newline at end of file
+module = "server.wsgi:application"
+
+# GUNICORN_ASGI=true serves server.asgi through uvicorn workers, so the async
+# /api/ask (ASYNC_CHAT=true) can hold many chats per worker.
+if os.environ.get("GUNICORN_ASGI", "false").lower() == "true":
+    worker_class = "uvicorn.workers.UvicornWorker"
+    wsgi_app = "server.asgi:application"
+
+# Import the app in the master so the embedding model can be loaded once before
+# workers fork; the weights are then shared copy-on-write instead of each
+# worker holding its own copy.
+preload_app = True
+
+
+def when_ready(server):
+    if os.environ.get("PRELOAD_EMBEDDING_MODEL", "true").lower() != "true":
+        return
+    if os.environ.get("EMBEDDING_SERVICE_SOCKET"):
+        return  # the embedding service holds the model
+    from national_park_explorer.embeddings import preload_embedding_model
+    preload_embedding_model()
+    server.log.info("Embedding model preloaded in master")
@@ -0,0 +1,247 @@
+"""
+Admission control for chats that need the LLM server.
+
+At most LLM_MAX_CONCURRENT_STREAMS chats hold an LLM slot at once. Chats only
+ask for a slot once the LLM is ready, so a cold start doesn't tie up every
+slot with chats that are only waiting for the server. Each slot
+is a cache key taken with `cache.add` and kept alive while its chat streams.
+Everyone else waits in one bounded queue, stored as a list under a single
+cache key and edited under a short cache lock. Waiters re-poll every
+LLM_ADMISSION_POLL_INTERVAL and are sent `queued` events with their position.
+
+The queue is ordered fairly, not strictly FIFO: a client's (user or IP) n-th
+chat (counting the ones already streaming) goes behind every other client's
+(n-1)-th. A client may hold at most LLM_ADMISSION_MAX_PER_CLIENT active plus
+queued chats. A chat that would overflow the queue or that
+per-client limit is rejected at once with a `busy` error instead of joining
+the pile-up. Queue entries whose owner stopped polling, and slots whose holder
+stopped sending keepalives, expire on their own, so a crashed worker can't
+leak capacity. While a chat blocks (e.g. waiting for the /infer response
+headers) `kept_alive()` refreshes its slot from a background thread.
+
+The limits are only global with a shared CACHES backend. With LocMemCache
+every worker has its own slots, so up to workers x LLM_MAX_CONCURRENT_STREAMS
+chats reach the LLM at once; `manage.py check` warns about that.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "llm_admission:queue"
+QUEUE_LOCK_KEY = "llm_admission:queue_lock"
+QUEUE_LOCK_TIMEOUT = 5
+SLOT_TTL = 60  # a slot without keepalives for this long is considered abandoned
+SLOT_KEEPALIVE_INTERVAL = 15
+
+
+def _slot_key(index):
+    return f"llm_admission:slot:{index}"
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@contextmanager
+def _queue_lock():
+    token = uuid.uuid4().hex
+    # A holder that died releases the lock when it times out
+    while not cache.add(QUEUE_LOCK_KEY, token, timeout=QUEUE_LOCK_TIMEOUT):
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        if cache.get(QUEUE_LOCK_KEY) == token:
+            cache.delete(QUEUE_LOCK_KEY)
+
+
+def fair_order(queue, active=()):
+    """
+    Order queue entries round-robin across clients, FIFO within each client.
+    `active` lists the clients of chats already holding a slot; those count
+    as each client's first turns.
+    """
+    seen = defaultdict(int)
+    for client in active:
+        seen[client] += 1
+    keyed = []
+    for arrival, entry in enumerate(queue):
+        keyed.append((seen[entry["client"]], arrival, entry))
+        seen[entry["client"]] += 1
+    return [entry for _, _, entry in sorted(keyed, key=lambda item: item[:2])]
+
+
+def _live_entries(queue, now):
+    stale_after = settings.LLM_ADMISSION_POLL_INTERVAL * 10
+    return [entry for entry in queue if now - entry["beat"] < stale_after]
+
+
+def _slots():
+    keys = [_slot_key(i) for i in range(settings.LLM_MAX_CONCURRENT_STREAMS)]
+    held = cache.get_many(keys)
+    return keys, held
+
+
+class ChatTicket:
+    def __init__(self, client_id):
+        self.id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.slot_key = None
+        self._last_keepalive = 0.0
+
+    @classmethod
+    def enqueue(cls, client_id):
+        """Join the queue, or raise AdmissionRejected if the queue or the client's share is full."""
+        ticket = cls(client_id)
+        with _queue_lock():
+            now = time.time()
+            queue = _live_entries(cache.get(QUEUE_KEY) or [], now)
+            if len(queue) >= settings.LLM_ADMISSION_MAX_QUEUE:
+                raise AdmissionRejected("queue_full")
+
+            _, held = _slots()
+            client_chats = sum(1 for entry in queue if entry["client"] == client_id)
+            client_chats += sum(1 for slot in held.values() if slot["client"] == client_id)
+            if client_chats >= settings.LLM_ADMISSION_MAX_PER_CLIENT:
+                raise AdmissionRejected("client_limit")
+
+            queue.append({"ticket": ticket.id, "client": client_id, "beat": now})
+            cache.set(QUEUE_KEY, queue, timeout=SLOT_TTL)
+        return ticket
+
+    def poll(self):
+        """
+        Try to take a free slot. Returns None once admitted, otherwise this
+        ticket's 0-based queue position and the queue length.
+        """
+        with _queue_lock():
+            now = time.time()
+            queue = _live_entries(cache.get(QUEUE_KEY) or [], now)
+            mine = next((entry for entry in queue if entry["ticket"] == self.id), None)
+            if mine is None:
+                # Expired during a stall (e.g. a slow cache); rejoin at the back
+                mine = {"ticket": self.id, "client": self.client_id, "beat": now}
+                queue.append(mine)
+            mine["beat"] = now
+
+            keys, held = _slots()
+            ordered = fair_order(queue, [slot["client"] for slot in held.values()])
+            position = ordered.index(mine)
+            free = [key for key in keys if key not in held]
+
+            # The first len(free) waiters each go for a different free slot
+            if position < len(free) and cache.add(free[position], {"ticket": self.id, "client": self.client_id}, timeout=SLOT_TTL):
+                self.slot_key = free[position]
+                self._last_keepalive = time.monotonic()
+                queue.remove(mine)
+                cache.set(QUEUE_KEY, queue, timeout=SLOT_TTL)
+                return None
+
+            cache.set(QUEUE_KEY, queue, timeout=SLOT_TTL)
+            return position, len(queue)
+
+    @property
+    def keepalive_due(self):
+        return self.slot_key is not None and time.monotonic() - self._last_keepalive >= SLOT_KEEPALIVE_INTERVAL
+
+    def keepalive(self):
+        if self.keepalive_due:
+            cache.set(self.slot_key, {"ticket": self.id, "client": self.client_id}, timeout=SLOT_TTL)
+            self._last_keepalive = time.monotonic()
+
+    def release(self):
+        if self.slot_key is not None:
+            slot = cache.get(self.slot_key)
+            if slot and slot["ticket"] == self.id:
+                cache.delete(self.slot_key)
+            self.slot_key = None
+            return
+        with _queue_lock():
+            queue = [entry for entry in cache.get(QUEUE_KEY) or [] if entry["ticket"] != self.id]
+            cache.set(QUEUE_KEY, queue, timeout=SLOT_TTL)
+
+
+class AdmissionWait:
+    """
+    Turns successive polls into a chat's `queued` events, ending either
+    admitted (holding a slot) or with a `busy`/`queue_timeout` error.
+    """
+
+    def __init__(self, client_id, timeout=None):
+        self.client_id = client_id
+        self.deadline = time.monotonic() + (timeout or settings.LLM_ADMISSION_QUEUE_TIMEOUT)
+        self.interval = settings.LLM_ADMISSION_POLL_INTERVAL
+        self.ticket = None
+        self.done = False
+        self.admitted = False
+        self._last_position = None
+
+    def step(self):
+        if not settings.LLM_ADMISSION_ENABLED:
+            self.done = self.admitted = True
+            return []
+
+        if self.ticket is None:
+            try:
+                self.ticket = ChatTicket.enqueue(self.client_id)
+            except AdmissionRejected as e:
+                logger.info(f"Rejected chat from {self.client_id}: {e.reason}")
+                self.done = True
+                return [{"event": "error", "type": "busy", "reason": e.reason, "retry_after": self.interval * 10}]
+
+        result = self.ticket.poll()
+        if result is None:
+            self.done = self.admitted = True
+            return []
+
+        if time.monotonic() >= self.deadline:
+            self.release()
+            self.done = True
+            return [{"event": "error", "type": "queue_timeout"}]
+
+        position, queue_length = result
+        if position == self._last_position:
+            return []
+        self._last_position = position
+        return [{"event": "queued", "position": position + 1, "queue_length": queue_length}]
+
+    @property
+    def keepalive_due(self):
+        return self.ticket is not None and self.ticket.keepalive_due
+
+    def keepalive(self):
+        if self.ticket is not None:
+            self.ticket.keepalive()
+
+    @contextmanager
+    def kept_alive(self):
+        """Keep the slot alive from a background thread while the caller blocks."""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(SLOT_KEEPALIVE_INTERVAL):
+                self.keepalive()
+
+        thread = threading.Thread(target=beat, name="admission-keepalive", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def release(self):
+        if self.ticket is not None:
+            self.ticket.release()
+            self.ticket = None
@@ -0,0 +1,84 @@
+"""
+Semantic answer cache for /api/ask.
+
+Answers are bucketed by (matched park, inferred intent) in the shared Django
+cache. A new question is served from the bucket when its embedding's cosine
+similarity to a cached question reaches ANSWER_CACHE_SIMILARITY_THRESHOLD.
+Bucket keys include the park's chunk version, which run_embedding_task bumps
+when that park's TextChunks are re-embedded, so old answers are no longer
+looked up. run_embedding_task runs in its own process, so the bump only
+reaches the web workers through a shared CACHES backend; that is why
+ANSWER_CACHE_ENABLED defaults to off unless CACHE_BACKEND is set.
+
+Only answers whose LLM stream completed without an error are stored.
+"""
+
+import re
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .embeddings import vector_from_bytes, vector_to_bytes
+from .versioning import get_data_version
+
+# Version keys bumped by run_embedding_task
+ALL_CHUNKS_VERSION = "text_chunks"
+
+
+def park_chunks_version_name(park_uuid):
+    return f"park_chunks:{park_uuid}"
+
+
+def _bucket_key(park_uuid, intent):
+    if park_uuid:
+        version = get_data_version(park_chunks_version_name(park_uuid))
+    else:
+        version = get_data_version(ALL_CHUNKS_VERSION)
+    return f"answer_cache:{park_uuid or 'global'}:{intent}:{version}"
+
+
+def _live_entries(entries, now):
+    return [e for e in entries or [] if now - e["created"] < settings.ANSWER_CACHE_TTL]
+
+
+def lookup_answer(query_embedding, park_uuid, intent):
+    """Return the cached answer for the most similar earlier question, or None."""
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+
+    entries = _live_entries(cache.get(_bucket_key(park_uuid, intent)), time.time())
+    if not entries:
+        return None
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+    matrix = np.stack([vector_from_bytes(e["embedding"]) for e in entries])
+    similarities = matrix @ query / np.clip(np.linalg.norm(matrix, axis=1), 1e-12, None)
+
+    best = int(np.argmax(similarities))
+    if similarities[best] >= settings.ANSWER_CACHE_SIMILARITY_THRESHOLD:
+        return entries[best]["answer"]
+    return None
+
+
+def store_answer(query_embedding, park_uuid, intent, question, answer):
+    if not settings.ANSWER_CACHE_ENABLED or not answer:
+        return
+
+    key = _bucket_key(park_uuid, intent)
+    now = time.time()
+    entries = _live_entries(cache.get(key), now)
+    entries.append({
+        "embedding": vector_to_bytes(query_embedding),
+        "question": question,
+        "answer": answer,
+        "created": now,
+    })
+    cache.set(key, entries[-settings.ANSWER_CACHE_MAX_PER_BUCKET:], timeout=settings.ANSWER_CACHE_TTL)
+
+
+def iter_answer_tokens(answer):
+    """Split a cached answer into word-sized pieces for replay as `token` events."""
+    return re.findall(r"\s*\S+", answer) or [answer]
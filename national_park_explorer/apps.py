@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'national_park_explorer'
+
+    def ready(self):
+        from . import checks  # noqa: F401  registers the system checks
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .versioning import shared_cache_configured
+
+
+@register()
+def admission_cache_check(app_configs, **kwargs):
+    """LLM admission limits are kept in the cache, so they only hold across workers with a shared one."""
+    if not settings.LLM_ADMISSION_ENABLED or shared_cache_configured():
+        return []
+    return [Warning(
+        "LLM admission control is enabled but the default cache is per-process, so each worker "
+        "admits LLM_MAX_CONCURRENT_STREAMS chats of its own.",
+        hint="Point CACHE_BACKEND/CACHE_LOCATION at a shared backend (Redis, Memcached, database).",
+        id="national_park_explorer.W001",
+    )]
@@ -0,0 +1,81 @@
+"""
+Server-side chat history for /api/ask.
+
+A client that sends `conversation_id` no longer resends `history`: the turns
+live in the shared Django cache under that id for CONVERSATION_TTL, and the
+final stream event carries just the id instead of the whole history.
+
+Turns are stored already pruned (at most CONVERSATION_MAX_TURNS, within
+CONVERSATION_MAX_TOKENS) and each turn keeps its token count, so adding a
+turn only counts the new messages and pruning drops whole turns from the
+front without re-counting the rest.
+
+Two chats racing on the same conversation each save their own turn, and the
+later save wins.
+
+Turns only survive across workers in a shared CACHES backend. With a
+per-process cache (the LocMemCache default) a follow-up served by another
+worker would silently lose its history, so `load_conversation` returns None
+and the chat falls back to client-held history: the final event then carries
+`updated_history` instead of a `conversation_id`.
+"""
+
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .llm_tokenizer import MESSAGE_OVERHEAD, count_tokens
+from .versioning import shared_cache_configured
+
+CONVERSATION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _key(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+class Conversation:
+    def __init__(self, conversation_id, turns=None):
+        self.id = conversation_id
+        self.turns = turns or []  # [{"messages": [{role, content}, ...], "tokens": n}]
+
+    @property
+    def tokens(self):
+        return sum(turn["tokens"] for turn in self.turns)
+
+    def messages(self):
+        return [message for turn in self.turns for message in turn["messages"]]
+
+    def append_turn(self, question, answer):
+        messages = [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ]
+        tokens = sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD for message in messages)
+        self.turns.append({"messages": messages, "tokens": tokens})
+
+        # Oldest turns go first, as prune_turns does for client-sent history
+        del self.turns[:max(len(self.turns) - settings.CONVERSATION_MAX_TURNS, 0)]
+        total = self.tokens
+        while self.turns and total > settings.CONVERSATION_MAX_TOKENS:
+            total -= self.turns.pop(0)["tokens"]
+
+    def save(self):
+        cache.set(_key(self.id), {"turns": self.turns}, timeout=settings.CONVERSATION_TTL)
+
+
+def load_conversation(conversation_id):
+    """
+    Return the stored conversation, an empty one if it has expired, or a new
+    conversation with a fresh id when `conversation_id` is empty or malformed.
+    Returns None when the cache isn't shared, so turns can't be kept server-side.
+    """
+    if not shared_cache_configured():
+        return None
+    conversation_id = str(conversation_id or "")
+    if not CONVERSATION_ID.match(conversation_id):
+        return Conversation(uuid.uuid4().hex)
+    stored = cache.get(_key(conversation_id))
+    return Conversation(conversation_id, stored["turns"] if stored else [])
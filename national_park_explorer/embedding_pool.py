@@ -0,0 +1,76 @@
+"""
+Process-pool entry points for `run_embedding_task --workers N` and
+`benchmark_embedding_service`.
+
+Workers are spawned, not forked, so each starts from a fresh interpreter.
+This module imports nothing from Django at the top: the initializers set up
+Django and load the encoder once per worker, and only then are models and
+the command code imported.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_benchmark = {}
+
+
+def init_worker(threads):
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from .embeddings import get_embedding_model, get_embedding_service_client
+
+    if get_embedding_service_client():
+        return
+    settings.ONNX_ENCODER_THREADS = threads
+    if settings.EMBEDDING_BACKEND == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    get_embedding_model()
+
+
+def embed_and_write(*args):
+    from .management.commands.run_embedding_task import embed_and_write
+    return embed_and_write(*args)
+
+
+def init_benchmark_worker(mode, socket_path, barrier):
+    """Load this worker's encoder, like a gunicorn worker: its own model, or a client of the shared service."""
+    import django
+    django.setup()
+
+    if mode == "service":
+        from .embedding_service import EmbeddingServiceClient
+        client = EmbeddingServiceClient(socket_path)
+        client.encode(["warm up"])
+        _benchmark["encode"] = lambda question: client.encode([question])[0]
+    else:
+        from .embeddings import get_embedding_model
+        model = get_embedding_model()
+        model.encode("warm up")
+        _benchmark["encode"] = model.encode
+    _benchmark["barrier"] = barrier
+
+
+def run_benchmark_share(questions, threads):
+    """
+    Encode `questions` on `threads` threads once every worker has loaded its
+    encoder. Returns (latencies in ms, start time, end time).
+    """
+    encode = _benchmark["encode"]
+
+    def timed(question):
+        started = time.perf_counter()
+        encode(question)
+        return (time.perf_counter() - started) * 1000
+
+    _benchmark["barrier"].wait()
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(timed, questions))
+    return latencies, started, time.time()
@@ -0,0 +1,206 @@
+"""
+Local embedding service with dynamic micro-batching.
+
+One process (`manage.py run_embedding_service`) holds the only copy of the
+model and listens on a Unix socket. Requests that arrive within a few
+milliseconds of each other are encoded as a single batch, which uses the
+transformer far better than many single-string `encode()` calls competing for
+CPU threads in separate workers.
+
+Wire format (both directions): 8-byte header `>II` (json_length,
+payload_length), a JSON object, then a raw payload. Requests send
+`{"texts": [...]}` with no payload; responses send `{"count": n, "dim": d}`
+followed by n*d float32 values, or `{"error": "..."}`.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct(">II")
+
+
+class EmbeddingServiceError(Exception):
+    pass
+
+
+def _recv_exactly(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        part = sock.recv(size - len(buffer))
+        if not part:
+            raise ConnectionError("embedding service closed the connection")
+        buffer.extend(part)
+    return bytes(buffer)
+
+
+def _frame(header, payload=b""):
+    header_bytes = json.dumps(header).encode("utf-8")
+    return FRAME_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+
+# ---------- Client ----------
+class EmbeddingServiceClient:
+    """Blocking client; keeps one connection per thread and reconnects once on failure."""
+
+    def __init__(self, socket_path, timeout=10):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _roundtrip(self, texts):
+        sock = getattr(self._local, "sock", None) or self._connect()
+        sock.sendall(_frame({"texts": texts}))
+        header_len, payload_len = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+        header = json.loads(_recv_exactly(sock, header_len))
+        payload = _recv_exactly(sock, payload_len) if payload_len else b""
+        return header, payload
+
+    def encode(self, texts):
+        """Return a (len(texts), dim) float32 array."""
+        try:
+            header, payload = self._roundtrip(list(texts))
+        except (OSError, ConnectionError):
+            # Stale connection (service restarted); retry once on a fresh one
+            self._close()
+            try:
+                header, payload = self._roundtrip(list(texts))
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+
+        if "error" in header:
+            raise EmbeddingServiceError(header["error"])
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["count"], header["dim"])
+
+
+# ---------- Server ----------
+class EmbeddingServer:
+    def __init__(self, encode, socket_path, batch_window_ms=5, max_batch_size=64):
+        self.encode = encode
+        self.socket_path = socket_path
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        # A single inference thread: batches run one after another, never concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.batches = 0
+        self.texts_encoded = 0
+
+    async def serve_forever(self):
+        self.queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Embedding service listening on {self.socket_path}")
+        batcher = asyncio.create_task(self._batch_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def _handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    raw_header = await reader.readexactly(FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                header_len, payload_len = FRAME_HEADER.unpack(raw_header)
+                request = json.loads(await reader.readexactly(header_len))
+                if payload_len:
+                    await reader.readexactly(payload_len)
+
+                texts = request.get("texts")
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    writer.write(_frame({"error": "'texts' must be a list of strings"}))
+                    await writer.drain()
+                    continue
+
+                future = loop.create_future()
+                await self.queue.put((texts, future))
+                try:
+                    vectors = await future
+                    writer.write(_frame({"count": len(vectors), "dim": vectors.shape[1] if len(vectors) else 0}, vectors.tobytes()))
+                except Exception as e:
+                    writer.write(_frame({"error": str(e)}))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = loop.time() + self.batch_window
+
+            # Collect whatever else arrives within the batching window
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in pending for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self._encode_batch, texts)
+            except Exception as e:
+                logger.exception("Embedding batch failed")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+            self.batches += 1
+            self.texts_encoded += len(texts)
+
+    def _encode_batch(self, texts):
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        started = time.perf_counter()
+        vectors = np.asarray(self.encode(texts, batch_size=max(len(texts), 1)), dtype=np.float32)
+        logger.debug(f"Encoded batch of {len(texts)} in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return vectors
@@ -0,0 +1,196 @@
+"""
+Embedding model access and query embedding helpers.
+
+The encoder (sentence-transformers on torch, or ONNX Runtime when
+EMBEDDING_BACKEND = "onnx") is created lazily by `get_embedding_model()`, so
+importing views or running commands that never embed anything doesn't import
+torch. Under gunicorn, `preload_embedding_model()` runs in the master before
+workers fork (see gunicorn_config.py) and the weights are shared copy-on-write.
+Alternatively, EMBEDDING_SERVICE_SOCKET routes all encoding through the shared
+micro-batching service in embedding_service.py.
+
+`query_embedding_cache` sits in front of the model: a bounded per-worker LRU,
+optionally backed by the shared Django cache, keyed on a hash of the normalized
+question. Vectors are stored as float32 bytes so a repeated question skips
+model inference entirely.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_embedding_model(settings.EMBEDDING_BACKEND)
+    return _model
+
+
+def load_embedding_model(backend):
+    """Build a fresh encoder for `backend` ("torch" or "onnx"); both expose encode()."""
+    if backend == "onnx":
+        from .onnx_encoder import OnnxEncoder
+        return OnnxEncoder(
+            settings.ONNX_ENCODER_DIR,
+            quantized=settings.ONNX_ENCODER_QUANTIZED,
+            threads=settings.ONNX_ENCODER_THREADS,
+        )
+
+    # Deferred: pulls in torch, which costs seconds and hundreds of MB
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(
+        settings.EMBEDDING_MODEL_NAME,
+        cache_folder=settings.EMBEDDING_MODEL_CACHE_FOLDER,
+    )
+
+
+def preload_embedding_model():
+    """Load the model now, e.g. in the gunicorn master before workers are forked."""
+    return get_embedding_model()
+
+
+_service_client = None
+
+
+def get_embedding_service_client():
+    global _service_client
+    if _service_client is None and settings.EMBEDDING_SERVICE_SOCKET:
+        from .embedding_service import EmbeddingServiceClient
+        _service_client = EmbeddingServiceClient(
+            settings.EMBEDDING_SERVICE_SOCKET, timeout=settings.EMBEDDING_SERVICE_TIMEOUT
+        )
+    return _service_client
+
+
+def encode_texts(texts, **kwargs):
+    """
+    Embed a string (-> 1-D array) or a list of strings (-> 2-D array).
+
+    Goes through the shared embedding service when EMBEDDING_SERVICE_SOCKET is
+    set, falling back to the in-process model if the service is unreachable
+    and EMBEDDING_SERVICE_FALLBACK is on.
+    """
+    client = get_embedding_service_client()
+    if client is not None:
+        single = isinstance(texts, str)
+        try:
+            vectors = client.encode([texts] if single else texts)
+            return vectors[0] if single else vectors
+        except Exception as e:
+            if not settings.EMBEDDING_SERVICE_FALLBACK:
+                raise
+            logger.warning(f"Embedding service unavailable, encoding in-process: {e}")
+
+    return get_embedding_model().encode(texts, **kwargs)
+
+
+def normalize_question(question):
+    # all-MiniLM-L6-v2 uses an uncased tokenizer, so case and spacing don't change the embedding
+    return _WHITESPACE_RE.sub(" ", question).strip().lower()
+
+
+def vector_to_bytes(vector):
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def vector_from_bytes(data):
+    return np.frombuffer(data, dtype=np.float32)
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries=1024, use_shared=False, shared_timeout=None):
+        self.max_entries = max_entries
+        self.use_shared = use_shared
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def key_for(self, question):
+        digest = hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()
+        return f"query_embedding:{settings.EMBEDDING_MODEL_NAME}:{settings.EMBEDDING_BACKEND}:{digest}"
+
+    def get(self, question):
+        key = self.key_for(question)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return vector_from_bytes(data)
+
+        if self.use_shared:
+            data = cache.get(key)
+            if data is not None:
+                self._store_local(key, data)
+                with self._lock:
+                    self.shared_hits += 1
+                return vector_from_bytes(data)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, question, vector):
+        key = self.key_for(question)
+        data = vector_to_bytes(vector)
+        self._store_local(key, data)
+        if self.use_shared:
+            cache.set(key, data, timeout=self.shared_timeout)
+
+    def _store_local(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_encode(self, question, encode):
+        """Return the cached embedding for `question`, calling `encode(question)` on a miss."""
+        vector = self.get(question)
+        if vector is None:
+            vector = np.asarray(encode(question), dtype=np.float32)
+            self.set(question, vector)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else None,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    use_shared=settings.QUERY_EMBEDDING_SHARED_CACHE,
+    shared_timeout=settings.QUERY_EMBEDDING_SHARED_CACHE_TIMEOUT,
+)
+
+
+def embed_query(question):
+    """Embed a chat question, going through the query embedding cache."""
+    return query_embedding_cache.get_or_encode(question, lambda text: encode_texts(text))
@@ -0,0 +1,182 @@
+"""
+Shared outbound HTTP client.
+
+Every call to the Lambda, the LLM server, NPS, OpenWeather and GitHub goes
+through `get()`/`post()` here instead of bare `requests.get`. Each host gets one
+`requests.Session` with its own keep-alive connection pool, so repeated calls
+skip the TCP (and TLS) handshake. Requests also get default timeouts, and
+idempotent methods are retried with jittered exponential backoff on
+connection errors and 429/5xx responses; callers that poll anyway pass
+`retries=0` and get a separate session that never retries. Per-host counters (requests, errors,
+latency, connections opened) are available from `stats()`.
+
+`get_async_client()` is the httpx equivalent for the ASGI chat view: one pooled
+AsyncClient per event loop.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _default_timeout():
+    return (settings.HTTP_CLIENT_CONNECT_TIMEOUT, settings.HTTP_CLIENT_READ_TIMEOUT)
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, error=False):
+        self.requests += 1
+        self.errors += int(error)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+
+class PooledHttpClient:
+    def __init__(self, pool_size=None, retries=None, backoff_factor=None):
+        self.pool_size = pool_size or settings.HTTP_CLIENT_POOL_SIZE
+        self.retries = settings.HTTP_CLIENT_RETRIES if retries is None else retries
+        self.backoff_factor = settings.HTTP_CLIENT_BACKOFF if backoff_factor is None else backoff_factor
+        self._sessions = {}
+        self._stats = defaultdict(HostStats)
+        self._lock = threading.Lock()
+
+    def _build_session(self, retries):
+        retry = Retry(
+            total=retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # never retries POST once it has been sent
+            raise_on_status=False,  # hand the last response back, as plain requests would
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session_for(self, url, retries=None):
+        retries = self.retries if retries is None else retries
+        key = (_host_key(url), retries)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._build_session(retries)
+        return session
+
+    def request(self, method, url, retries=None, **kwargs):
+        kwargs.setdefault("timeout", _default_timeout())
+        host = _host_key(url)
+        started = time.perf_counter()
+        try:
+            response = self.session_for(url, retries).request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._stats[host].record((time.perf_counter() - started) * 1000, error=True)
+            raise
+        # For streamed responses this is the time to headers, not to the last byte
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats[host].record(elapsed_ms, error=response.status_code >= 500)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _connections_opened(self, host):
+        opened = 0
+        for (session_host, _), session in self._sessions.items():
+            if session_host == host:
+                pools = session.get_adapter(host + "/").poolmanager.pools
+                opened += sum(pools[key].num_connections for key in pools.keys())
+        return opened
+
+    def stats(self):
+        with self._lock:
+            return {
+                host: {
+                    "requests": s.requests,
+                    "errors": s.errors,
+                    "avg_ms": round(s.total_ms / s.requests, 2) if s.requests else 0.0,
+                    "max_ms": round(s.max_ms, 2),
+                    "connections_opened": self._connections_opened(host),
+                }
+                for host, s in self._stats.items()
+            }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledHttpClient()
+    return _client
+
+
+def get(url, **kwargs):
+    return get_http_client().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_http_client().post(url, **kwargs)
+
+
+def stats():
+    return get_http_client().stats()
+
+
+# httpx clients are bound to the event loop that first used them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_READ_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+            transport=httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_keepalive_connections=settings.HTTP_CLIENT_POOL_SIZE),
+                retries=settings.HTTP_CLIENT_RETRIES,  # connection errors only
+            ),
+        )
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,100 @@
+"""
+Extractive "instant answer" for chats that would otherwise wait on an LLM
+cold start.
+
+The best-ranked retrieved chunks are split into sentences and the sentences
+closest to the question (cosine similarity against the query embedding the
+chat already has) are sent as an `instant_answer` event before the
+generative answer.
+
+Sentence embeddings are cached per chunk in the shared Django cache, keyed by
+a hash of the chunk text so re-embedded chunks never reuse stale sentences.
+Only chunks seen for the first time are encoded, all in one batch.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .embeddings import encode_texts, vector_from_bytes, vector_to_bytes
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+MIN_SENTENCE_LENGTH = 20  # shorter fragments are headings and list stubs
+SENTENCE_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text or "") if len(s.strip()) >= MIN_SENTENCE_LENGTH]
+
+
+def _cache_key(chunk_text):
+    return f"chunk_sentences:{hashlib.sha1(chunk_text.encode('utf-8')).hexdigest()}"
+
+
+def chunk_sentence_embeddings(chunks):
+    """Return [(sentences, matrix)] per chunk, encoding only the chunks not cached yet."""
+    keys = [_cache_key(chunk.chunk_text) for chunk in chunks]
+    cached = cache.get_many(keys)
+
+    missing = [(key, split_sentences(chunk.chunk_text)) for key, chunk in zip(keys, chunks) if key not in cached]
+    texts = [sentence for _, sentences in missing for sentence in sentences]
+    if texts:
+        vectors = np.asarray(encode_texts(texts), dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        fresh = {}
+        offset = 0
+        for key, sentences in missing:
+            rows = vectors[offset:offset + len(sentences)]
+            offset += len(sentences)
+            fresh[key] = {"sentences": sentences, "embeddings": [vector_to_bytes(row) for row in rows]}
+        cache.set_many(fresh, timeout=SENTENCE_CACHE_TIMEOUT)
+        cached.update(fresh)
+    for key, sentences in missing:
+        if not sentences:
+            cached[key] = {"sentences": [], "embeddings": []}
+
+    results = []
+    for key in keys:
+        entry = cached[key]
+        matrix = np.stack([vector_from_bytes(b) for b in entry["embeddings"]]) if entry["embeddings"] else None
+        results.append((entry["sentences"], matrix))
+    return results
+
+
+def build_instant_answer(query_embedding, chunks):
+    """
+    Return the `instant_answer` event for the best INSTANT_ANSWER_MAX_CHUNKS
+    chunks, or None when no sentence reaches INSTANT_ANSWER_MIN_SIMILARITY.
+    """
+    chunks = chunks[:settings.INSTANT_ANSWER_MAX_CHUNKS]
+    if not chunks:
+        return None
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+
+    candidates = []
+    for chunk, (sentences, matrix) in zip(chunks, chunk_sentence_embeddings(chunks)):
+        if matrix is None:
+            continue
+        for sentence, similarity in zip(sentences, matrix @ query):
+            candidates.append((float(similarity), sentence, chunk))
+
+    best = sorted(candidates, key=lambda c: c[0], reverse=True)[:settings.INSTANT_ANSWER_MAX_SENTENCES]
+    best = [c for c in best if c[0] >= settings.INSTANT_ANSWER_MIN_SIMILARITY]
+    if not best:
+        return None
+
+    sources = []
+    for _, _, chunk in best:
+        source = {"source_type": chunk.source_type, "chunk_type": chunk.chunk_type, "source_uuid": str(chunk.source_uuid)}
+        if source not in sources:
+            sources.append(source)
+    return {
+        "event": "instant_answer",
+        "text": " ".join(sentence for _, sentence, _ in best),
+        "sources": sources,
+    }
@@ -0,0 +1,83 @@
+"""
+Raw relay of the LLM server's NDJSON `/infer` stream.
+
+With LLM_RELAY_MODE = "raw" the chat views forward the response bytes as they
+arrive (cut at the last newline so clients still receive whole lines) instead
+of decoding every line with `json.loads`. The answer text, which the views
+need for the history event and the answer cache, comes from a
+TokenTextScanner: a regex finds `"event": "token"` lines and
+`json.decoder.scanstring` decodes just their `"text"` value.
+
+If the server ends the stream with a trailer event,
+`{"event": "final", "text": "<whole answer>"}`, that text is used as is and
+the per-token text is ignored. An `{"event": "error"}` line sets `errored`,
+so a failed answer isn't cached.
+"""
+
+import re
+from json.decoder import scanstring
+
+TOKEN_EVENT = re.compile(rb'"event"\s*:\s*"token"')
+TRAILER_EVENT = re.compile(rb'"event"\s*:\s*"final"')
+ERROR_EVENT = re.compile(rb'"event"\s*:\s*"error"')
+TEXT_FIELD = re.compile(rb'"text"\s*:\s*"')
+
+
+def _string_field(line, pattern=TEXT_FIELD):
+    match = pattern.search(line)
+    if match is None:
+        return None
+    # scanstring starts just past the opening quote and stops at the closing one
+    text, _ = scanstring(line[match.end():].decode("utf-8"), 0)
+    return text
+
+
+class TokenTextScanner:
+    def __init__(self):
+        self._pending = b""
+        self._parts = []
+        self.tokens = 0
+        self.final_text = None
+        self.errored = False
+
+    @property
+    def text(self):
+        return self.final_text if self.final_text is not None else "".join(self._parts)
+
+    def feed(self, data):
+        """Consume a chunk of the stream; return the complete lines in it (possibly b"")."""
+        if self._pending:
+            data = self._pending + data
+        end = data.rfind(b"\n") + 1
+        self._pending = data[end:]
+        complete = data[:end]
+        if complete:
+            # Inlined rather than calling _scan_line: this runs once per token
+            is_token = TOKEN_EVENT.search
+            for line in complete.split(b"\n"):
+                if line and is_token(line):
+                    text = _string_field(line)
+                    if text:
+                        self._parts.append(text)
+                    self.tokens += 1
+                elif line:
+                    self._scan_other(line)
+        return complete
+
+    def flush(self):
+        """Return whatever is left after the stream ends, as a final line."""
+        rest, self._pending = self._pending, b""
+        if not rest.strip():
+            return b""
+        if TOKEN_EVENT.search(rest):
+            self._parts.append(_string_field(rest) or "")
+            self.tokens += 1
+        else:
+            self._scan_other(rest)
+        return rest + b"\n"
+
+    def _scan_other(self, line):
+        if TRAILER_EVENT.search(line):
+            self.final_text = _string_field(line) or ""
+        elif ERROR_EVENT.search(line):
+            self.errored = True
@@ -0,0 +1,237 @@
+"""
+Shared LLM server readiness for /api/ask.
+
+The Lambda status, the LLM server's IP and the last `/health` result live in
+the Django cache under one key with a short TTL. Chats never call the Lambda or
+the LLM health endpoint themselves: they mark themselves active, make sure this
+worker's prober thread is running, and read the shared state.
+
+Each worker runs at most one prober thread, and only while chats have been
+active within LLM_STATUS_ACTIVE_WINDOW. Probers in different workers take turns
+through a cache lock, so the Lambda and health endpoint see one call per
+LLM_STATUS_POLL_INTERVAL however many users are chatting. With the default
+LocMemCache the lock is per worker; point CACHES at a shared backend to make
+it global.
+
+`POST /api/ask/warm` (warm_llm) starts the same prober before the first
+question, and keeps it running for LLM_WARM_ACTIVE_WINDOW so a cold start can
+finish. Chats from a client that warmed recently are logged with
+`warmed: true` in their chat_timings line, so their `llm_wait` can be compared
+with cold chats.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from . import http_client
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = "llm_status:state"
+ACTIVE_KEY = "llm_status:active"
+PROBE_LOCK_KEY = "llm_status:probe_lock"
+WARM_KEY = "llm_status:warm:{}"
+WARM_RATE_KEY = "llm_status:warm_rate:{}"
+# Lambda statuses that mean the LLM instance is (still) cold-starting
+COLD_START_STATUSES = ("starting", "cold")
+
+PROBE_CONNECT_TIMEOUT = 5
+LAMBDA_TIMEOUT = 10
+HEALTH_TIMEOUT = 10
+# Upper bound on one probe, so the lock outlives it and probes never overlap.
+# Probe calls are never retried (the next probe is one interval away), so
+# each costs at most its connect plus read timeout.
+PROBE_TIMEOUT = 2 * PROBE_CONNECT_TIMEOUT + LAMBDA_TIMEOUT + HEALTH_TIMEOUT + 10
+
+
+def llm_auth_headers():
+    return {"Authorization": f"Bearer {settings.LLM_LAMBDA_SECRET}"}
+
+
+def get_llm_state():
+    """Return the last probe result, or None if there is no fresh one."""
+    return cache.get(STATE_KEY)
+
+
+def probe_llm_status():
+    """Ask the Lambda for the server status, health-check it if ready, and publish the result."""
+    state = {
+        "status": None, "llm_ip": None, "healthy": None, "message": None,
+        "lambda_probe_ms": None, "health_check_ms": None, "checked_at": time.time(),
+    }
+    headers = llm_auth_headers()
+
+    started = time.perf_counter()
+    try:
+        data = http_client.get(
+            os.getenv("LAMBDA_LLM_START_URL"),
+            headers=headers,
+            timeout=(PROBE_CONNECT_TIMEOUT, LAMBDA_TIMEOUT),
+            retries=0,
+        ).json()
+        logger.info(f"Lambda status probe: {data}")
+        state["status"] = data.get("status")
+        state["llm_ip"] = data.get("llm_ip")
+    except Exception as e:
+        state["status"] = "error"
+        state["message"] = str(e)
+    state["lambda_probe_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    if state["status"] == "ready":
+        if not state["llm_ip"]:
+            state["status"] = "starting"
+        else:
+            started = time.perf_counter()
+            try:
+                health = http_client.get(
+                    f"http://{state['llm_ip']}:5000/health",
+                    headers=headers,
+                    timeout=(PROBE_CONNECT_TIMEOUT, HEALTH_TIMEOUT),
+                    retries=0,
+                )
+                state["healthy"] = health.json().get("status") == "ok"
+                if not state["healthy"]:
+                    logger.warning("LLM health endpoint did not return ok")
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"LLM health check failed: {e}")
+                state["healthy"] = False
+            state["health_check_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    state["checked_at"] = time.time()
+    cache.set(STATE_KEY, state, timeout=settings.LLM_STATUS_TTL)
+    return state
+
+
+def try_probe_llm_status():
+    """Probe unless another prober holds the lock; returns the new state or None."""
+    if not cache.add(PROBE_LOCK_KEY, os.getpid(), timeout=settings.LLM_STATUS_POLL_INTERVAL + PROBE_TIMEOUT):
+        return None
+    try:
+        return probe_llm_status()
+    finally:
+        # Hold the lock for one interval after the probe so the next one is spaced out
+        cache.set(PROBE_LOCK_KEY, os.getpid(), timeout=settings.LLM_STATUS_POLL_INTERVAL)
+
+
+_prober_thread = None
+_prober_lock = threading.Lock()
+
+
+def _prober_loop():
+    global _prober_thread
+
+    while True:
+        with _prober_lock:
+            # Checked under the lock so ensure_llm_prober() can't see a thread that is about to exit
+            if not cache.get(ACTIVE_KEY):
+                _prober_thread = None
+                return
+        try:
+            try_probe_llm_status()
+        except Exception:
+            logger.exception("LLM status probe failed")
+        time.sleep(settings.LLM_STATUS_POLL_INTERVAL)
+
+
+def mark_chat_active(window=None):
+    now = time.time()
+    # The key holds its expiry time so a chat never shortens a longer warm-up window
+    active_until = max(now + (window or settings.LLM_STATUS_ACTIVE_WINDOW), cache.get(ACTIVE_KEY) or 0)
+    cache.set(ACTIVE_KEY, active_until, timeout=active_until - now)
+
+
+def ensure_llm_prober(window=None):
+    """Record chat activity and start this worker's prober thread if it isn't running."""
+    global _prober_thread
+
+    mark_chat_active(window)
+    with _prober_lock:
+        if _prober_thread is None:
+            _prober_thread = threading.Thread(target=_prober_loop, name="llm-status-prober", daemon=True)
+            _prober_thread.start()
+
+
+def read_llm_state():
+    """What a waiting chat calls every tick."""
+    ensure_llm_prober()
+    return get_llm_state()
+
+
+class LLMReadinessWait:
+    """
+    Turns successive reads of the shared state into a chat's `starting`,
+    `ready` and error events, emitting each probe result at most once.
+    `cold_start` turns True once a probe reports a cold start; until the
+    first probe lands (no state yet) nothing is known either way.
+    """
+
+    def __init__(self, timeout=None):
+        self.deadline = time.monotonic() + (timeout or settings.LLM_READY_TIMEOUT)
+        self.interval = settings.LLM_STATUS_WAIT_INTERVAL
+        self.llm_ip = None
+        self.done = False
+        self.cold_start = False
+        self._attempt = 0
+        self._seen_checked_at = None
+
+    def observe(self, state):
+        """Return the events for `state` and set `done` (and `llm_ip` on success) when finished."""
+        if state and state["checked_at"] != self._seen_checked_at:
+            self._seen_checked_at = state["checked_at"]
+            self._attempt += 1
+            status = state["status"]
+
+            if status == "disabled":
+                self.done = True
+                return [{"event": "error", "type": "usage_limit"}]
+
+            if status == "ready":
+                self.done = True
+                if not state["healthy"]:
+                    return [{"event": "error", "type": "health_check_failed"}]
+                self.llm_ip = state["llm_ip"]
+                return [{"event": "ready"}]
+
+            if status in COLD_START_STATUSES:
+                self.cold_start = True
+                events = [{"event": "starting", "attempt": self._attempt}]
+            elif status == "error":
+                events = [{"event": "error", "type": "lambda_error", "message": state["message"]}]
+            else:
+                events = []
+        else:
+            events = []
+
+        if time.monotonic() >= self.deadline:
+            self.done = True
+            events.append({"event": "error", "type": "llm_server_not_ready"})
+        return events
+
+
+class WarmRateLimited(Exception):
+    pass
+
+
+def warm_llm(client_id):
+    """
+    Start probing (which starts the LLM instance through the Lambda) without
+    waiting for it. Returns the current shared state, or raises
+    WarmRateLimited if `client_id` warmed within LLM_WARM_MIN_INTERVAL.
+    `client_id` must not be client-controlled (see views.chat_client_id).
+    """
+    if not cache.add(WARM_RATE_KEY.format(client_id), True, timeout=settings.LLM_WARM_MIN_INTERVAL):
+        raise WarmRateLimited()
+    cache.set(WARM_KEY.format(client_id), time.time(), timeout=settings.LLM_WARM_ACTIVE_WINDOW)
+    ensure_llm_prober(settings.LLM_WARM_ACTIVE_WINDOW)
+    return get_llm_state()
+
+
+def was_warmed(client_id):
+    """True if `client_id` called warm_llm within LLM_WARM_ACTIVE_WINDOW."""
+    return cache.get(WARM_KEY.format(client_id)) is not None
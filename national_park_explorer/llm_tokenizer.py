@@ -0,0 +1,85 @@
+"""
+Token counting with the chat LLM's own tokenizer.
+
+Context budgeting in /api/ask needs counts in the LLM's tokens, not the
+embedding model's. LLM_TOKENIZER_NAME is either a path to a `tokenizer.json`
+or a Hugging Face repo id, loaded with the `tokenizers` library. If it is unset
+or cannot be loaded, counts fall back to the ~4 characters per token estimate.
+
+TextChunk rows store their rendered context line and its token count (filled in
+by run_embedding_task), so at request time only the system prompt, question
+and history are tokenized.
+"""
+
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Budget for the "N. " prefix and newline joining a context line to the prompt
+CONTEXT_LINE_OVERHEAD = 4
+# Role markers and separators the chat template adds around each message
+MESSAGE_OVERHEAD = 4
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_llm_tokenizer():
+    """Return the LLM's `tokenizers.Tokenizer`, or None when only the estimate is available."""
+    global _tokenizer, _tokenizer_loaded
+
+    if _tokenizer_loaded:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            name = settings.LLM_TOKENIZER_NAME
+            if name:
+                try:
+                    from tokenizers import Tokenizer
+
+                    if os.path.isfile(name):
+                        _tokenizer = Tokenizer.from_file(name)
+                    else:
+                        _tokenizer = Tokenizer.from_pretrained(name)
+                except Exception as e:
+                    logger.warning(f"Could not load LLM tokenizer {name!r}, estimating token counts: {e}")
+            else:
+                logger.warning("LLM_TOKENIZER_NAME is not set, estimating token counts")
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def tokenizer_fingerprint():
+    """Which counter stored token counts come from: the tokenizer name, or "estimate"."""
+    return settings.LLM_TOKENIZER_NAME if get_llm_tokenizer() is not None else "estimate"
+
+
+def estimate_tokens(text):
+    """Rough token estimation: ~4 characters per token for English text."""
+    return len(text) // 4
+
+
+def count_tokens(text):
+    tokenizer = get_llm_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def count_tokens_batch(texts):
+    tokenizer = get_llm_tokenizer()
+    if tokenizer is None:
+        return [estimate_tokens(text) for text in texts]
+    return [len(encoding.ids) for encoding in tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+
+def render_context_line(source_type, chunk_type, chunk_text):
+    """The `[SOURCE - type]: text` line a chunk contributes to the LLM context."""
+    content = chunk_text.strip().replace("\n", " ")
+    return f"[{source_type.upper()} - {chunk_type or 'general'}]: {content}"
@@ -0,0 +1,65 @@
+import math
+import multiprocessing
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from national_park_explorer import embedding_pool
+
+SAMPLE_QUESTIONS = [
+    "What are the best things to do in Yellowstone?",
+    "How much is the entrance fee for Zion National Park?",
+    "What is the weather like in Acadia in October?",
+    "How do I get to the Grand Canyon South Rim?",
+    "Are there campgrounds with RV hookups in Great Smoky Mountains?",
+    "Can I bring my dog on trails in Shenandoah?",
+    "What is the phone number for Yosemite National Park?",
+    "Which hikes in Glacier National Park are good for kids?",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare single-string in-process encode() against the micro-batching embedding service under concurrency, "
+        "spread over worker processes like gunicorn's"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Socket path (defaults to settings.EMBEDDING_SERVICE_SOCKET)")
+        parser.add_argument("--processes", type=int, default=4, help="Worker processes, as gunicorn workers")
+        parser.add_argument("--concurrency", type=int, default=24, help="Concurrent requests across all processes")
+        parser.add_argument("--requests", type=int, default=480)
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or settings.EMBEDDING_SERVICE_SOCKET
+        if not socket_path:
+            raise CommandError("No socket path: pass --socket or set EMBEDDING_SERVICE_SOCKET.")
+
+        # Unique strings so nothing can be served from a cache
+        questions = [
+            f"{SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)]} (variant {i})" for i in range(options["requests"])
+        ]
+
+        self.stdout.write(f"🔍 {options['processes']} processes, {options['concurrency']} concurrent requests")
+        for label, mode in [("in-process encode()", "local"), ("embedding service", "service")]:
+            self._report(label, mode, socket_path, questions, options["processes"], options["concurrency"])
+
+    def _report(self, label, mode, socket_path, questions, processes, concurrency):
+        context = multiprocessing.get_context("spawn")
+        # Every worker waits here until all have loaded their encoder, so loading isn't timed
+        barrier = context.Barrier(processes)
+        threads = max(math.ceil(concurrency / processes), 1)
+        shares = [(questions[i::processes], threads) for i in range(processes)]
+
+        with context.Pool(processes, initializer=embedding_pool.init_benchmark_worker, initargs=(mode, socket_path, barrier)) as pool:
+            results = pool.starmap(embedding_pool.run_benchmark_share, shares, chunksize=1)
+
+        latencies = np.array([latency for share_latencies, _, _ in results for latency in share_latencies])
+        elapsed = max(finished for _, _, finished in results) - min(started for _, started, _ in results)
+        self.stdout.write(
+            f"{label:<22} {len(questions) / elapsed:8.1f} req/s   "
+            f"p50 {np.percentile(latencies, 50):7.1f} ms   "
+            f"p95 {np.percentile(latencies, 95):7.1f} ms   "
+            f"p99 {np.percentile(latencies, 99):7.1f} ms"
+        )
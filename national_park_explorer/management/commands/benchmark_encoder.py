@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from national_park_explorer.onnx_encoder import PARITY_TEXTS, OnnxEncoder
+from national_park_explorer.embeddings import load_embedding_model
+
+
+class Command(BaseCommand):
+    help = "Check ONNX encoder parity with the torch model (cosine similarity) and compare per-query latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-cosine", type=float, default=0.99)
+        parser.add_argument("--queries", type=int, default=200, help="Single-text encode() calls per backend for latency")
+
+    def handle(self, *args, **options):
+        torch_model = load_embedding_model("torch")
+        encoders = {"torch": torch_model}
+        for quantized in (False, True):
+            label = "onnx-int8" if quantized else "onnx-fp32"
+            try:
+                encoders[label] = OnnxEncoder(
+                    settings.ONNX_ENCODER_DIR, quantized=quantized, threads=settings.ONNX_ENCODER_THREADS
+                )
+            except Exception as e:
+                self.stderr.write(f"⚠️ Skipping {label}: {e}")
+
+        if len(encoders) == 1:
+            raise CommandError("No ONNX encoder found; run `manage.py export_onnx_encoder` first.")
+
+        reference = np.asarray(torch_model.encode(PARITY_TEXTS, normalize_embeddings=True), dtype=np.float32)
+        failed = False
+
+        self.stdout.write(f"{'backend':<12}{'min cos':>10}{'mean cos':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, encoder in encoders.items():
+            vectors = np.asarray(encoder.encode(PARITY_TEXTS, normalize_embeddings=True), dtype=np.float32)
+            cosines = (vectors * reference).sum(axis=1)
+
+            encoder.encode(PARITY_TEXTS[0])  # warm up
+            latencies = []
+            for i in range(options["queries"]):
+                started = time.perf_counter()
+                encoder.encode(PARITY_TEXTS[i % len(PARITY_TEXTS)])
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(
+                f"{label:<12}{cosines.min():>10.4f}{cosines.mean():>10.4f}"
+                f"{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+            )
+            if cosines.min() < options["min_cosine"]:
+                failed = True
+
+        if failed:
+            raise CommandError(f"Parity check failed: cosine similarity below {options['min_cosine']}")
+        self.stdout.write(self.style.SUCCESS("✅ ONNX encoders match the torch model."))
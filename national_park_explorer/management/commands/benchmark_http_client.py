@@ -0,0 +1,78 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from django.core.management.base import BaseCommand
+
+from national_park_explorer.http_client import PooledHttpClient
+
+STUB_BODY = b'{"status": "ready", "llm_ip": "127.0.0.1"}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.counter_lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_BODY)))
+        self.end_headers()
+        self.wfile.write(STUB_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Compare per-call requests.get with the pooled http_client against a local stub server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--delay-ms", type=float, default=0, help="Simulated server processing time")
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        server.daemon_threads = True
+        server.connections = 0
+        server.counter_lock = threading.Lock()
+        server.delay = options["delay_ms"] / 1000
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/status"
+        n = options["requests"]
+        self.stdout.write(f"🔍 {n} GETs per client against {url}")
+
+        try:
+            client = PooledHttpClient()
+            for label, get in [
+                ("requests.get", lambda: requests.get(url, timeout=5)),
+                ("http_client", lambda: client.get(url)),
+            ]:
+                get()  # warm-up (imports, first pool)
+                server.connections = 0
+                latencies = []
+                for _ in range(n):
+                    started = time.perf_counter()
+                    get().json()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<13} p50 {np.percentile(latencies, 50):6.3f} ms   "
+                    f"p95 {np.percentile(latencies, 95):6.3f} ms   "
+                    f"mean {np.mean(latencies):6.3f} ms   new connections {server.connections}"
+                )
+            self.stdout.write(f"📊 Pooled client stats: {client.stats()}")
+            client.close()
+        finally:
+            server.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            "✅ Done. Loopback has no TLS and ~0 RTT; real savings per call grow with handshake round trips."
+        ))
@@ -0,0 +1,62 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from national_park_explorer.llm_relay import TokenTextScanner
+
+WORDS = ["the", " park", " trail", " is", " open", " from", " May", " to", " October", ",", " and", " the",
+         " entrance", " fee", " is", " $35", " per", " vehicle", ".", "\n", " Café", " “Vista”", " 🌲"]
+
+
+def line_relay(chunks):
+    """What the "lines" mode does per chunk: decode, split into lines, json.loads each."""
+    answer = ""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk.decode("utf-8")
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line:
+                payload = json.loads(line)
+                if payload.get("event") == "token":
+                    answer += payload.get("text", "")
+                _ = line + "\n"
+    return answer
+
+
+def raw_relay(chunks):
+    scanner = TokenTextScanner()
+    for chunk in chunks:
+        scanner.feed(chunk)
+    scanner.flush()
+    return scanner.text
+
+
+class Command(BaseCommand):
+    help = "Compare CPU per streamed token for the 'lines' and 'raw' /infer relay modes on a synthetic stream"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tokens", type=int, default=2000, help="Tokens per simulated answer")
+        parser.add_argument("--runs", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        tokens = [rng.choice(WORDS) for _ in range(options["tokens"])]
+        # One network chunk per token line, as the LLM server flushes them
+        chunks = [(json.dumps({"event": "token", "text": t}) + "\n").encode("utf-8") for t in tokens]
+        chunks.append(b'{"event": "done"}\n')
+        expected = "".join(tokens)
+
+        self.stdout.write(f"🔍 {options['runs']} runs x {len(tokens)} tokens")
+        for label, relay in [("lines", line_relay), ("raw", raw_relay)]:
+            assert relay(chunks) == expected, f"{label} relay produced the wrong answer text"
+            started = time.process_time()
+            for _ in range(options["runs"]):
+                relay(chunks)
+            cpu_us = (time.process_time() - started) / (options["runs"] * len(tokens)) * 1e6
+            self.stdout.write(f"{label:<6} {cpu_us:6.2f} µs CPU per token")
+
+        self.stdout.write(self.style.SUCCESS("✅ Done."))
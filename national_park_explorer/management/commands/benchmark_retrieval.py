@@ -0,0 +1,382 @@
+import json
+import random
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from national_park_explorer.embeddings import embed_query, encode_texts
+from national_park_explorer.llm_tokenizer import count_tokens_batch, render_context_line
+from national_park_explorer.models import Alert, Campground, Park_Data, TextChunk
+from national_park_explorer.park_matcher import match_park
+from national_park_explorer.timing import StageTimer
+from national_park_explorer.vector_index import export_vector_index
+from national_park_explorer.views import (
+    get_top_chunks,
+    infer_intent_from_query,
+    preferred_chunk_types,
+    retrieve_chunks,
+)
+from national_park_explorer.management.commands.run_embedding_task import (
+    alert_chunk_texts,
+    campground_chunk_texts,
+    chunk_text,
+    park_chunk_texts,
+)
+
+# Golden questions, asked about every sampled park. A question is answered
+# well when the final context holds a chunk of one of `expected_types`
+# (from `expected_source_type`, if set) belonging to the park it names.
+GOLDEN_QUESTIONS = [
+    {"template": "What is the entrance fee for {park}?", "expected_types": ["fees"]},
+    {"template": "How much is an annual pass for {park}?", "expected_types": ["pass", "fees"]},
+    {"template": "What is the weather like at {park}?", "expected_types": ["weather"]},
+    {"template": "Directions to {park}", "expected_types": ["directions"]},
+    {"template": "What is the phone number for {park}?", "expected_types": ["contact"]},
+    {"template": "What activities are there at {park}?", "expected_types": ["activities_topics"]},
+    {"template": "Tell me about {park}", "expected_types": ["overview"]},
+    {"template": "Where can I camp at {park}?", "expected_types": ["overview", "amenities"], "expected_source_type": "campground"},
+    {"template": "Are there any current alerts or closures at {park}?", "expected_types": ["alert_info"]},
+]
+
+MODES = ["global", "per_type"]
+SEED_PREFIX = "bench-"
+
+# Word lists for synthetic park names; chosen to contain none of the words infer_intent_from_query keys on
+NAME_WORDS = ["Silver", "Granite", "Cedar", "Falcon", "Juniper", "Copper", "Crystal", "Eagle", "Sunset", "Black",
+              "Painted", "Hidden", "Lost", "Misty", "Golden", "Thunder", "Quiet", "Echo", "Coral", "Iron"]
+PLACE_WORDS = ["Canyon", "Ridge", "Mesa", "Lake", "Valley", "Peak", "Bluffs", "Basin", "Springs", "Butte",
+               "Cliffs", "Gorge", "Hollow", "Island", "Prairie", "Forest", "Dunes", "Glacier", "Falls", "Marsh"]
+DESIGNATIONS = ["National Park", "National Monument", "National Seashore", "National Preserve"]
+ACTIVITIES = ["Hiking", "Camping", "Fishing", "Stargazing", "Kayaking", "Birdwatching", "Horseback Riding",
+              "Rock Climbing", "Snowshoeing", "Wildlife Viewing", "Scenic Driving", "Backpacking"]
+TOPICS = ["Geology", "Volcanoes", "Native American Heritage", "Glaciers", "Caves", "Fossils", "Forests",
+          "Rivers", "Night Sky", "Pioneer History", "Waterfalls", "Coastal Ecosystems"]
+CLIMATES = ["Summers are hot and dry, with afternoon thunderstorms in July and August.",
+            "Winters bring heavy snow above 7,000 feet; many roads close from November to May.",
+            "Fog is common along the coast in the mornings; bring layers year round.",
+            "Spring and fall are mild, and the best seasons for long hikes."]
+
+
+@contextmanager
+def rolled_back_savepoint():
+    """
+    Run a retrieval query inside a savepoint that is rolled back afterwards.
+    The benchmark runs in one transaction, where the SET LOCALs of one query
+    (e.g. enable_indexscan = off for exact search) would otherwise last until
+    the end and change how every later query is planned.
+    """
+    savepoint = transaction.savepoint()
+    try:
+        yield
+    finally:
+        transaction.savepoint_rollback(savepoint)
+
+
+def percentiles_ms(samples):
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    values = np.asarray(samples)
+    return {f"p{p}": round(float(np.percentile(values, p)), 3) for p in (50, 95, 99)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a golden question set through the retrieval pipeline and report latency, "
+        "recall@k against exact search and chunk-type hit rates; optionally seed synthetic data first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-parks", type=int, default=0,
+                            help="Create this many synthetic parks (with campgrounds, alerts and embedded chunks) before running")
+        parser.add_argument("--campgrounds-per-park", type=int, default=2)
+        parser.add_argument("--alerts-per-park", type=int, default=1)
+        parser.add_argument("--keep", action="store_true", help="Commit the seeded rows instead of rolling them back afterwards")
+        parser.add_argument("--parks", type=int, default=50, help="Parks to ask the golden questions about")
+        parser.add_argument("--golden", help="JSON file with extra questions: [{\"question\": ..., \"expected_types\": [...]}]")
+        parser.add_argument("--modes", default=",".join(MODES))
+        parser.add_argument("--k", type=int, default=20, help="k for recall@k of the global vector search")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per question and mode")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the results as JSON to this path")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        seeded = None
+
+        with ExitStack() as stack:
+            # Seeded rows only exist inside this transaction: it is rolled back
+            # at the end (or on failure), so the live tables never see them.
+            stack.enter_context(transaction.atomic())
+            if not options["keep"]:
+                stack.callback(transaction.set_rollback, True)
+
+            if options["seed_parks"]:
+                seeded = {"parks": [], "sources": []}
+                self.seed(rng, options, seeded)
+                if settings.RETRIEVAL_BACKEND == "numpy":
+                    # Search a private export that includes the seeded rows
+                    index_dir = stack.enter_context(tempfile.TemporaryDirectory())
+                    export_vector_index(index_dir)
+                    stack.enter_context(override_settings(VECTOR_INDEX_DIR=index_dir))
+
+            questions = self.build_questions(rng, options, seeded)
+            if not questions:
+                raise CommandError("No questions to ask: seed parks with --seed-parks or load Park_Data first.")
+
+            results = {
+                "config": {
+                    "backend": settings.RETRIEVAL_BACKEND,
+                    "ef_search": settings.VECTOR_SEARCH_EF_SEARCH,
+                    "k": options["k"],
+                    "repeat": options["repeat"],
+                    "seed": options["seed"],
+                },
+                "dataset": {
+                    "text_chunks": TextChunk.objects.count(),
+                    "parks": Park_Data.objects.count(),
+                    "seeded_parks": options["seed_parks"],
+                },
+                "questions": len(questions),
+                "modes": {},
+            }
+            self.stdout.write(
+                f"📊 {results['dataset']['text_chunks']} chunks, {results['dataset']['parks']} parks, "
+                f"{len(questions)} questions, backend={settings.RETRIEVAL_BACKEND}"
+            )
+
+            self.stdout.write(
+                f"🔍 Measuring recall@{options['k']} of the unscoped vector search against exact search..."
+            )
+            recall = self.measure_recall(questions, options["k"])
+
+            for mode in options["modes"].split(","):
+                result = self.run_mode(mode, questions, options["repeat"])
+                if mode == "global":
+                    result["recall_at_k"] = recall
+                results["modes"][mode] = result
+                self.report(mode, result)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark complete."))
+
+    # ---------- Questions ----------
+    def build_questions(self, rng, options, seeded):
+        if seeded:
+            park_names = list(Park_Data.objects.filter(uuid__in=seeded["parks"]).values_list("full_name", flat=True))
+        else:
+            park_names = list(Park_Data.objects.exclude(full_name="").values_list("full_name", flat=True))
+        rng.shuffle(park_names)
+
+        entries = []
+        for park_name in park_names[:options["parks"]]:
+            for golden in GOLDEN_QUESTIONS:
+                entries.append({**golden, "question": golden["template"].format(park=park_name)})
+        if options["golden"]:
+            with open(options["golden"]) as f:
+                entries.extend(json.load(f))
+
+        self.stdout.write(f"⚙️ Embedding {len(entries)} questions...")
+        questions = []
+        for entry in entries:
+            question = entry["question"]
+            park = match_park(question)
+            questions.append({
+                "question": question,
+                "embedding": embed_query(question).tolist(),
+                "intent": infer_intent_from_query(question),
+                "park_uuid": park.uuid if park else None,
+                "expected_types": entry.get("expected_types") or [],
+                "expected_source_type": entry.get("expected_source_type"),
+            })
+        return questions
+
+    # ---------- Measurements ----------
+    def measure_recall(self, questions, k):
+        """
+        Recall of the ANN index over the whole table. Park-scoped searches are
+        exact already (they skip the index), so the questions are searched
+        without their park here.
+        """
+        recalls = []
+        for q in questions:
+            with rolled_back_savepoint():
+                approximate = {c.id for c in get_top_chunks(q["embedding"], k=k)}
+            with rolled_back_savepoint():
+                exact = {c.id for c in get_top_chunks(q["embedding"], k=k, exact=True)}
+            if exact:
+                recalls.append(len(approximate & exact) / len(exact))
+        return round(float(np.mean(recalls)), 4) if recalls else None
+
+    def run_mode(self, mode, questions, repeat):
+        stage_samples = defaultdict(list)
+        intent_hits = defaultdict(list)
+        expected_hits = defaultdict(list)
+
+        for q in questions:
+            for _ in range(repeat):
+                timer = StageTimer()
+                with rolled_back_savepoint():
+                    _, chunks = retrieve_chunks(q["embedding"], q["intent"], park_uuid=q["park_uuid"], mode=mode, timer=timer)
+                for stage, ms in timer.as_dict().items():
+                    stage_samples[stage].append(ms)
+
+            preferred = preferred_chunk_types(q["intent"])
+            intent_hits[q["intent"]].append(any(c.chunk_type in preferred for c in chunks))
+            if q["expected_types"]:
+                key = "/".join(q["expected_types"])
+                expected_hits[key].append(any(
+                    c.chunk_type in q["expected_types"]
+                    and (q["park_uuid"] is None or c.park_uuid == q["park_uuid"])
+                    and (q["expected_source_type"] is None or c.source_type == q["expected_source_type"])
+                    for c in chunks
+                ))
+
+        all_expected = [hit for hits in expected_hits.values() for hit in hits]
+        return {
+            "latency_ms": {stage: percentiles_ms(samples) for stage, samples in stage_samples.items()},
+            "intent_preferred_type_hit_rate": {
+                intent: round(float(np.mean(hits)), 4) for intent, hits in intent_hits.items()
+            },
+            "expected_type_hit_rate": round(float(np.mean(all_expected)), 4) if all_expected else None,
+            "expected_type_hit_rate_by_type": {
+                key: round(float(np.mean(hits)), 4) for key, hits in expected_hits.items()
+            },
+        }
+
+    def report(self, mode, result):
+        latency = result["latency_ms"]
+        self.stdout.write(f"\n== {mode} ==")
+        for stage in ("vector_search", "rerank", "total"):
+            if stage in latency:
+                l = latency[stage]
+                self.stdout.write(f"  {stage:<14} p50 {l['p50']:8.2f} ms   p95 {l['p95']:8.2f} ms   p99 {l['p99']:8.2f} ms")
+        if result.get("recall_at_k") is not None:
+            self.stdout.write(f"  recall@k       {result['recall_at_k']:.3f}")
+        if result["expected_type_hit_rate"] is not None:
+            self.stdout.write(f"  expected hit   {result['expected_type_hit_rate']:.3f}")
+        for key, rate in result["expected_type_hit_rate_by_type"].items():
+            self.stdout.write(f"    {key:<22} {rate:.3f}")
+        intents = "  ".join(f"{i}={r:.2f}" for i, r in result["intent_preferred_type_hit_rate"].items())
+        self.stdout.write(f"  intent hit     {intents}")
+
+    # ---------- Synthetic data ----------
+    def seed(self, rng, options, seeded):
+        """Create synthetic parks, campgrounds, alerts and their chunks, recording their uuids in `seeded`."""
+        n = options["seed_parks"]
+        self.stdout.write(f"🌱 Seeding {n} synthetic parks...")
+        chunk_rows = []  # (source_type, source_uuid, park_uuid, chunk_type, raw_text)
+
+        for i in range(n):
+            name = f"{NAME_WORDS[i % len(NAME_WORDS)]} {PLACE_WORDS[(i // len(NAME_WORDS)) % len(PLACE_WORDS)]}"
+            if i >= len(NAME_WORDS) * len(PLACE_WORDS):
+                name += f" {i // (len(NAME_WORDS) * len(PLACE_WORDS)) + 1}"
+            designation = rng.choice(DESIGNATIONS)
+            park_code = f"zz{i:04d}"
+            park = Park_Data.objects.create(
+                park_id=f"{SEED_PREFIX}{park_code}",
+                park_code=park_code,
+                full_name=f"{name} {designation}",
+                name=name,
+                designation=designation,
+                description=f"{name} protects {rng.randint(20, 900)} square miles of "
+                            f"{rng.choice(['high desert', 'old-growth forest', 'rugged coastline', 'alpine tundra'])} "
+                            f"and is known for its {rng.choice(TOPICS).lower()}.",
+                directions_info=f"From Interstate {rng.randint(5, 95)}, take exit {rng.randint(1, 300)} and follow "
+                                f"State Route {rng.randint(1, 400)} for {rng.randint(5, 60)} miles to the visitor center.",
+                weather_info=rng.choice(CLIMATES),
+                phone_number=f"({rng.randint(200, 999)}) 555-{rng.randint(1000, 9999)}",
+                phone_type="Voice",
+                email=f"{park_code}_info@nps.gov",
+                mailing_address_line1=f"{rng.randint(1, 9999)} Park Headquarters Road",
+                mailing_city=f"{rng.choice(PLACE_WORDS)}ville",
+                mailing_state="ZZ",
+                mailing_postal_code=f"{rng.randint(10000, 99999)}",
+                activity_names=rng.sample(ACTIVITIES, 4),
+                topic_names=rng.sample(TOPICS, 3),
+                entrance_fee_title="Private Vehicle",
+                entrance_fee_cost=rng.choice([0, 15, 20, 25, 30, 35]),
+                entrance_fee_description="Admits one private vehicle and all occupants for 7 days.",
+                entrance_pass_title=f"{name} Annual Pass",
+                entrance_pass_cost=rng.choice([45, 55, 70, 80]),
+                entrance_pass_description="Valid for one year from the month of purchase.",
+                raw_data={},
+            )
+            seeded["parks"].append(park.uuid)
+            for chunk_type, raw_text in park_chunk_texts(park).items():
+                chunk_rows.append(("park_data", park.uuid, park.uuid, chunk_type, raw_text))
+
+            for j in range(options["campgrounds_per_park"]):
+                cg = Campground.objects.create(
+                    campground_id=f"{SEED_PREFIX}{park_code}-cg{j}",
+                    park_code=park_code,
+                    name=f"{rng.choice(PLACE_WORDS)} {rng.choice(['Campground', 'Group Camp', 'RV Park'])}",
+                    description=f"{rng.randint(10, 300)} sites near the {rng.choice(PLACE_WORDS).lower()}, open "
+                                f"{rng.choice(['year round', 'May through September', 'June through October'])}.",
+                    directions_overview=f"{rng.randint(1, 20)} miles past the entrance station on the left.",
+                    wheelchair_access=rng.choice(["Two accessible sites", "No accessible sites"]),
+                    rv_info=f"RVs up to {rng.randint(20, 45)} feet.",
+                    cell_phone_info=rng.choice(["No service", "Limited coverage"]),
+                    internet_info=rng.choice(["None", "Wi-Fi at the camp store"]),
+                    fire_stove_policy=rng.choice(["Fires in provided rings only.", "No wood fires during summer."]),
+                    raw_data={},
+                )
+                seeded["sources"].append(cg.uuid)
+                for chunk_type, raw_text in campground_chunk_texts(cg, park.full_name).items():
+                    chunk_rows.append(("campground", cg.uuid, park.uuid, chunk_type, raw_text))
+
+            for j in range(options["alerts_per_park"]):
+                alert = Alert.objects.create(
+                    alert_id=f"{SEED_PREFIX}{park_code}-alert{j}",
+                    title=f"{rng.choice(['Road Closure', 'Trail Closure', 'Fire Restrictions', 'Flood Warning'])} "
+                          f"at {rng.choice(PLACE_WORDS)}",
+                    description="Expect delays; check with a ranger before heading out.",
+                    category=rng.choice(["Park Closure", "Caution", "Information"]),
+                    park_code=park_code,
+                )
+                seeded["sources"].append(alert.uuid)
+                for chunk_type, raw_text in alert_chunk_texts(alert, park.full_name).items():
+                    chunk_rows.append(("alert", alert.uuid, park.uuid, chunk_type, raw_text))
+
+        # Split into chunks exactly like run_embedding_task, then embed in batches
+        pieces = []
+        for source_type, source_uuid, park_uuid, chunk_type, raw_text in chunk_rows:
+            for chunk in chunk_text(raw_text):
+                pieces.append((source_type, source_uuid, park_uuid, chunk_type, chunk))
+
+        self.stdout.write(f"⚙️ Embedding {len(pieces)} synthetic chunks...")
+        started = time.perf_counter()
+        next_index = defaultdict(int)
+        for start in range(0, len(pieces), 256):
+            batch = pieces[start:start + 256]
+            embeddings = encode_texts([piece[4] for piece in batch])
+            lines = [render_context_line(source_type, chunk_type, chunk) for source_type, _, _, chunk_type, chunk in batch]
+            token_counts = count_tokens_batch(lines)
+            chunks = []
+            for (source_type, source_uuid, park_uuid, chunk_type, chunk), embedding, line, token_count in zip(
+                batch, embeddings, lines, token_counts
+            ):
+                chunks.append(TextChunk(
+                    source_type=source_type,
+                    source_uuid=source_uuid,
+                    park_uuid=park_uuid,
+                    chunk_index=next_index[source_uuid],
+                    chunk_text=chunk,
+                    embedding=embedding.tolist(),
+                    chunk_type=chunk_type,
+                    relevance_tags=[chunk_type, f"park_uuid:{park_uuid}"],
+                    context_line=line,
+                    token_count=token_count,
+                ))
+                next_index[source_uuid] += 1
+            TextChunk.objects.bulk_create(chunks)
+        self.stdout.write(f"Seeded {len(pieces)} chunks in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,117 @@
+import io
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from national_park_explorer.models import EMBEDDING_DIMENSIONS
+
+BENCH_TABLE = "bench_textchunk_embedding"
+
+
+def random_unit_vectors(rng, n, dims, centers, noise=0.35):
+    """Clustered, L2-normalised vectors, roughly shaped like sentence embeddings."""
+    picks = rng.integers(0, len(centers), size=n)
+    vectors = centers[picks] + noise * rng.standard_normal((n, dims)).astype(np.float32) / np.sqrt(dims)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def percentile_ms(samples, pct):
+    return float(np.percentile(samples, pct) * 1000) if samples else 0.0
+
+
+class Command(BaseCommand):
+    help = "Benchmark exact vs HNSW inner-product search (p50/p95 latency and recall@k) on synthetic embeddings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,50000,100000,300000", help="Comma-separated row counts to test")
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--k", type=int, default=20)
+        parser.add_argument("--ef-search", default="20,40,80,160", help="Comma-separated hnsw.ef_search values")
+        parser.add_argument("--m", type=int, default=16)
+        parser.add_argument("--ef-construction", type=int, default=64)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stderr.write("❌ This benchmark needs PostgreSQL with the pgvector extension.")
+            return
+
+        sizes = sorted(int(s) for s in options["sizes"].split(","))
+        ef_values = [int(e) for e in options["ef_search"].split(",")]
+        k = options["k"]
+        rng = np.random.default_rng(options["seed"])
+        centers = rng.standard_normal((256, EMBEDDING_DIMENSIONS)).astype(np.float32)
+
+        with connection.cursor() as cursor:
+            # Temp table: lives only for this connection and never touches TextChunk
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {BENCH_TABLE} (id bigserial PRIMARY KEY, embedding vector({EMBEDDING_DIMENSIONS}))"
+            )
+
+            rows = 0
+            for size in sizes:
+                self.stdout.write(f"⚙️ Loading {size - rows} rows (total {size})...")
+                self._copy_vectors(cursor, random_unit_vectors(rng, size - rows, EMBEDDING_DIMENSIONS, centers))
+                rows = size
+
+                cursor.execute(f"DROP INDEX IF EXISTS {BENCH_TABLE}_hnsw")
+                started = time.perf_counter()
+                cursor.execute(
+                    f"CREATE INDEX {BENCH_TABLE}_hnsw ON {BENCH_TABLE} "
+                    f"USING hnsw (embedding vector_ip_ops) WITH (m = %s, ef_construction = %s)",
+                    [options["m"], options["ef_construction"]],
+                )
+                cursor.execute(f"ANALYZE {BENCH_TABLE}")
+                build_seconds = time.perf_counter() - started
+
+                queries = random_unit_vectors(rng, options["queries"], EMBEDDING_DIMENSIONS, centers)
+                exact_ids, exact_times = self._run_queries(cursor, queries, k, exact=True)
+
+                self.stdout.write(f"\n📊 {size} rows — HNSW build {build_seconds:.1f}s, k={k}")
+                self.stdout.write(f"{'mode':<16}{'p50 ms':>10}{'p95 ms':>10}{'recall@k':>10}")
+                self.stdout.write(
+                    f"{'exact (seqscan)':<16}{percentile_ms(exact_times, 50):>10.2f}{percentile_ms(exact_times, 95):>10.2f}{1.0:>10.3f}"
+                )
+                for ef in ef_values:
+                    ann_ids, ann_times = self._run_queries(cursor, queries, k, ef_search=max(ef, k))
+                    recall = np.mean([
+                        len(set(a) & set(e)) / max(len(e), 1) for a, e in zip(ann_ids, exact_ids)
+                    ])
+                    label = f"hnsw ef={ef}"
+                    self.stdout.write(
+                        f"{label:<16}{percentile_ms(ann_times, 50):>10.2f}{percentile_ms(ann_times, 95):>10.2f}{recall:>10.3f}"
+                    )
+                self.stdout.write("")
+
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark complete."))
+
+    def _copy_vectors(self, cursor, vectors):
+        buffer = io.StringIO()
+        for vector in vectors:
+            buffer.write("[" + ",".join(f"{x:.6f}" for x in vector) + "]\n")
+        buffer.seek(0)
+        cursor.cursor.copy_expert(f"COPY {BENCH_TABLE} (embedding) FROM STDIN", buffer)
+
+    def _run_queries(self, cursor, queries, k, exact=False, ef_search=None):
+        ids, timings = [], []
+        for query in queries:
+            query_str = "[" + ",".join(f"{x:.6f}" for x in query) + "]"
+            with transaction.atomic():
+                if exact:
+                    cursor.execute("SET LOCAL enable_indexscan = off")
+                else:
+                    cursor.execute("SET LOCAL hnsw.ef_search = %s", [ef_search])
+                started = time.perf_counter()
+                cursor.execute(
+                    f"SELECT id FROM {BENCH_TABLE} ORDER BY embedding <#> %s::vector LIMIT %s",
+                    [query_str, k],
+                )
+                ids.append([row[0] for row in cursor.fetchall()])
+                timings.append(time.perf_counter() - started)
+        return ids, timings
@@ -0,0 +1,57 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from national_park_explorer.embeddings import load_embedding_model
+from national_park_explorer.onnx_encoder import MODEL_FILENAME, QUANTIZED_MODEL_FILENAME
+
+
+class Command(BaseCommand):
+    help = "Export the sentence-transformer to ONNX (plus an int8 dynamically quantized copy) for EMBEDDING_BACKEND='onnx'"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=None, help="Output directory (defaults to settings.ONNX_ENCODER_DIR)")
+        parser.add_argument("--no-quantize", action="store_true", help="Skip writing the int8 model")
+        parser.add_argument("--opset", type=int, default=17)
+
+    def handle(self, *args, **options):
+        import torch
+
+        output_dir = options["output"] or settings.ONNX_ENCODER_DIR
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.stdout.write("🔍 Loading torch model...")
+        model = load_embedding_model("torch")
+        transformer = model[0].auto_model.eval()
+        tokenizer = model.tokenizer
+
+        # Writes tokenizer.json, which OnnxEncoder loads with the `tokenizers` library
+        tokenizer.save_pretrained(output_dir)
+
+        sample = tokenizer(["An example sentence about a national park."], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        model_path = os.path.join(output_dir, MODEL_FILENAME)
+        self.stdout.write(f"⚙️ Exporting {model_path}...")
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                model_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=options["opset"],
+            )
+
+        if not options["no_quantize"]:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILENAME)
+            self.stdout.write(f"⚙️ Quantizing to {quantized_path}...")
+            quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ ONNX encoder written to {output_dir}"))
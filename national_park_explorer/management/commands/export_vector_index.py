@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from national_park_explorer.vector_index import export_vector_index
+
+
+class Command(BaseCommand):
+    help = "Export TextChunk embeddings to the memory-mapped NumPy index used by RETRIEVAL_BACKEND='numpy'"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=None, help="Output directory (defaults to settings.VECTOR_INDEX_DIR)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or settings.VECTOR_INDEX_DIR
+        self.stdout.write(f"📦 Exporting embeddings to {directory}...")
+        version = export_vector_index(directory=directory, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Published vector index version {version}."))
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure getParks latency alone and while N /api/ask chats are streaming against a running server; "
+        "with --wait-chats, also report chat outcomes, throughput and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running server")
+        parser.add_argument("--chats", type=int, default=50)
+        parser.add_argument("--probes", type=int, default=100, help="getParks requests per phase")
+        parser.add_argument("--probe-interval", type=float, default=0.2, help="Seconds between getParks requests")
+        parser.add_argument("--question", default="What are the best things to do in Yellowstone National Park?")
+        parser.add_argument("--clients", type=int, default=None,
+                            help="Distinct client IPs (sent as X-Forwarded-For) the chats are spread over; default one per chat. "
+                                 "Only honoured when --url is the app server itself: a proxy appends the real address, "
+                                 "which is what admission counts")
+        parser.add_argument("--wait-chats", action="store_true", help="Let the chats finish instead of cancelling them")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        base_url = options["url"].rstrip("/")
+        limits = httpx.Limits(max_connections=options["chats"] + 10)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(600, connect=10)) as client:
+            self.stdout.write("📏 Baseline getParks latency (no chats)...")
+            baseline = await self._probe(client, options)
+            self._report("baseline", baseline)
+
+            self.stdout.write(f"💬 Starting {options['chats']} chats...")
+            clients = options["clients"] or options["chats"]
+            chats_started = time.perf_counter()
+            chats = [
+                asyncio.create_task(self._chat(client, f"{options['question']} ({i})", f"10.{i % clients // 256}.{i % clients % 256}.1"))
+                for i in range(options["chats"])
+            ]
+            await asyncio.sleep(1)  # let the chats occupy the server first
+            loaded = await self._probe(client, options)
+            self._report(f"{options['chats']} chats", loaded)
+
+            in_flight = sum(not chat.done() for chat in chats)
+            self.stdout.write(f"Chats still streaming when probing finished: {in_flight}/{len(chats)}")
+            if options["wait_chats"]:
+                results = await asyncio.gather(*chats)
+                self._report_chats(results, time.perf_counter() - chats_started)
+                return
+            for chat in chats:
+                chat.cancel()
+            await asyncio.gather(*chats, return_exceptions=True)
+
+    async def _chat(self, client, question, client_ip):
+        """Stream one chat; return its outcome, total and first-token latency (ms), and worst queue position."""
+        started = time.perf_counter()
+        result = {"outcome": "incomplete", "first_token_ms": None, "max_position": 0}
+        headers = {"X-Forwarded-For": client_ip}
+        async with client.stream("POST", "/api/ask", json={"question": question, "history": []}, headers=headers) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                kind = event.get("event")
+                if kind == "queued":
+                    result["max_position"] = max(result["max_position"], event["position"])
+                elif kind == "token" and result["first_token_ms"] is None:
+                    result["first_token_ms"] = (time.perf_counter() - started) * 1000
+                elif kind == "history":
+                    result["outcome"] = "completed"
+                elif kind == "error":
+                    result["outcome"] = event.get("reason") or event.get("type", "error")
+        result["total_ms"] = (time.perf_counter() - started) * 1000
+        return result
+
+    async def _probe(self, client, options):
+        latencies = []
+        for _ in range(options["probes"]):
+            started = time.perf_counter()
+            response = await client.get("/getParks/", params={"start": 0, "limit": 50})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(options["probe_interval"])
+        return latencies
+
+    def _report(self, label, latencies, metric="getParks"):
+        self.stdout.write(
+            f"{label:<12} {metric} p50 {np.percentile(latencies, 50):8.1f} ms   "
+            f"p95 {np.percentile(latencies, 95):8.1f} ms   max {max(latencies):8.1f} ms"
+        )
+
+    def _report_chats(self, results, elapsed):
+        outcomes = Counter(result["outcome"] for result in results)
+        self.stdout.write("📊 Chat outcomes: " + ", ".join(f"{name} {count}" for name, count in outcomes.most_common()))
+        completed = [result for result in results if result["outcome"] == "completed"]
+        self.stdout.write(f"Throughput: {len(completed) / elapsed:.2f} completed chats/s over {elapsed:.1f} s")
+        if completed:
+            self._report("completed", [result["total_ms"] for result in completed], metric="chat")
+            first_tokens = [result["first_token_ms"] for result in completed if result["first_token_ms"] is not None]
+            if first_tokens:
+                self._report("completed", first_tokens, metric="first token")
+        rejected = [result["total_ms"] for result in results if result["outcome"] in ("queue_full", "client_limit")]
+        if rejected:
+            self.stdout.write(f"Rejected chats answered in p95 {np.percentile(rejected, 95):.1f} ms")
+        self.stdout.write(f"Worst queue position seen: {max(result['max_position'] for result in results)}")
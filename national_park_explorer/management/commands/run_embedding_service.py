@@ -0,0 +1,36 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from national_park_explorer.embedding_service import EmbeddingServer
+from national_park_explorer.embeddings import get_embedding_model
+
+
+class Command(BaseCommand):
+    help = "Serve embeddings over a Unix socket, micro-batching concurrent requests through one model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=None, help="Socket path (defaults to settings.EMBEDDING_SERVICE_SOCKET)")
+        parser.add_argument("--batch-window-ms", type=float, default=None)
+        parser.add_argument("--max-batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"] or settings.EMBEDDING_SERVICE_SOCKET
+        if not socket_path:
+            raise CommandError("No socket path: pass --socket or set EMBEDDING_SERVICE_SOCKET.")
+
+        self.stdout.write("🔍 Loading embedding model...")
+        model = get_embedding_model()
+
+        server = EmbeddingServer(
+            encode=model.encode,
+            socket_path=socket_path,
+            batch_window_ms=options["batch_window_ms"] or settings.EMBEDDING_SERVICE_BATCH_WINDOW_MS,
+            max_batch_size=options["max_batch_size"] or settings.EMBEDDING_SERVICE_MAX_BATCH,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ Embedding service listening on {socket_path}"))
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            self.stdout.write(f"Stopped after {server.batches} batches ({server.texts_encoded} texts).")
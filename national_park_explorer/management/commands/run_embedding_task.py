@@ -1,8 +1,25 @@
 from django.core.management.base import BaseCommand
-from sentence_transformers import SentenceTransformer
 from national_park_explorer.models import Alert, Campground, Park_Data, TextChunk
+from national_park_explorer.vector_index import export_vector_index
+from national_park_explorer.embeddings import encode_texts, get_embedding_service_client
+from national_park_explorer import embedding_pool
+from national_park_explorer.llm_tokenizer import count_tokens_batch, render_context_line, tokenizer_fingerprint
+from national_park_explorer.answer_cache import ALL_CHUNKS_VERSION, park_chunks_version_name
+from national_park_explorer.versioning import bump_data_version
 from django.db import transaction
+from django.db.models import Max, Min
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from collections import Counter
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
 from tqdm import tqdm
+import multiprocessing
+import hashlib
+import json
+import os
+import time
+import uuid
 import nltk
 from nltk.tokenize import sent_tokenize
 import logging
@@ -15,6 +32,9 @@ except LookupError:
 # Configs
 CHUNK_CHAR_LIMIT = 900
 USE_SENTENCE_CHUNKING = True
+# Bump when chunking or context lines change in a way the source texts don't show
+CONTENT_HASH_VERSION = 1
+FLUSH_CHUNKS = 4096  # chunks encoded and written together (fewer with --workers); checkpointed after each
 
 logger = logging.getLogger(__name__)
 
@@ -48,154 +68,370 @@ def chunk_text(text, max_chars=CHUNK_CHAR_LIMIT, use_sentence_chunking=USE_SENTE
         chunks.append(current_chunk.strip())
     return chunks
 
+# The fields each *_chunk_texts reads; sources are streamed with only these (no raw_data)
+ALERT_FIELDS = ["uuid", "park_code", "title", "description", "category", "url"]
+CAMPGROUND_FIELDS = [
+    "uuid", "park_code", "name", "description", "directions_overview", "wheelchair_access", "rv_info",
+    "cell_phone_info", "internet_info", "fire_stove_policy",
+]
+PARK_FIELDS = [
+    "uuid", "full_name", "name", "description", "activity_names", "topic_names", "directions_info", "weather_info",
+    "entrance_fee_title", "entrance_fee_description", "entrance_fee_cost",
+    "entrance_pass_title", "entrance_pass_description", "entrance_pass_cost",
+    "phone_number", "phone_type", "email",
+    "mailing_address_line1", "mailing_city", "mailing_state", "mailing_postal_code",
+]
+ITERATOR_CHUNK_SIZE = 2000  # rows fetched per round trip from the server-side cursor
+DELETE_BATCH_SIZE = 500  # source uuids per orphan DELETE, well under SQLite's parameter limit
+
+def park_lookup():
+    """park_code -> (display name, uuid) for every park, in one query."""
+    parks = {}
+    for park_code, park_uuid, full_name, name in Park_Data.objects.order_by("id").values_list("park_code", "uuid", "full_name", "name"):
+        parks.setdefault(park_code, (full_name or name, park_uuid))
+    return parks
+
+def alert_chunk_texts(alert, park_name):
+    return {
+        "alert_info": "\n".join(filter(None, [
+            f"[Alert] {alert.title}",
+            f"Park: {park_name}",
+            alert.description,
+            f"Category: {alert.category}",
+            alert.url,
+        ])),
+    }
+
+def campground_chunk_texts(cg, park_name):
+    return {
+        "overview": f"[Campground] {cg.name}\nPark: {park_name}\n{cg.description}",
+        "directions": f"Directions: {cg.directions_overview}",
+        "accessibility": f"Wheelchair Access: {cg.wheelchair_access}\nRV Info: {cg.rv_info}",
+        "amenities": f"Amenities: Cell = {cg.cell_phone_info}, Internet = {cg.internet_info}",
+        "fire_policy": f"Fire Policy: {cg.fire_stove_policy}",
+    }
+
+def park_chunk_texts(park):
+    activity_str = ", ".join(park.activity_names or [])
+    topic_str = ", ".join(park.topic_names or [])
+
+    return {
+        "overview": f"[Park] {park.full_name or park.name}\n{park.description}",
+        "activities_topics": f"Activities: {activity_str}\nTopics: {topic_str}",
+        "directions": f"Directions: {park.directions_info}",
+        "weather": f"Weather Info: {park.weather_info}",
+        "fees": f"Entrance Fee: {park.entrance_fee_title} - {park.entrance_fee_description} (${park.entrance_fee_cost})",
+        "pass": f"Entrance Pass: {park.entrance_pass_title} - {park.entrance_pass_description} (${park.entrance_pass_cost})",
+        "contact": f"Contact: {park.phone_number} ({park.phone_type}), Email: {park.email}",
+        "address": f"Address: {park.mailing_address_line1}, {park.mailing_city}, {park.mailing_state} {park.mailing_postal_code}",
+    }
+
+def source_content_hash(park_uuid, texts):
+    """
+    Hash of everything a source record's chunks are built from: its texts,
+    park, model, chunking and the tokenizer behind their stored token_count.
+    """
+    payload = json.dumps({
+        "version": CONTENT_HASH_VERSION,
+        "model": settings.EMBEDDING_MODEL_NAME,
+        "tokenizer": tokenizer_fingerprint(),
+        "chunking": [CHUNK_CHAR_LIMIT, USE_SENTENCE_CHUNKING],
+        "park_uuid": str(park_uuid) if park_uuid else None,
+        "texts": texts,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def stored_sources(source_type):
+    """source_uuid -> (content hash of its chunks, or None if they disagree; when its oldest chunk was written)"""
+    rows = (
+        TextChunk.objects.filter(source_type=source_type)
+        .values("source_uuid")
+        .annotate(min_hash=Min("content_hash"), max_hash=Max("content_hash"), written=Min("created_at"))
+    )
+    return {
+        row["source_uuid"]: (row["min_hash"] if row["min_hash"] == row["max_hash"] else None, row["written"])
+        for row in rows
+    }
+
+def load_checkpoint():
+    try:
+        with open(settings.EMBEDDING_CHECKPOINT_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(checkpoint):
+    tmp_path = f"{settings.EMBEDDING_CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, settings.EMBEDDING_CHECKPOINT_FILE)
+
+def encode_sorted(texts, batch_size):
+    """Encode in batch_size batches of similar length, so batches pad little; results keep input order."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    embeddings = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        for i, embedding in zip(batch, encode_texts([texts[i] for i in batch], batch_size=batch_size)):
+            embeddings[i] = embedding
+    return embeddings
+
+def embed_and_write(source_type, pending, batch_size, write_batch_size):
+    """
+    Encode the pending records' chunks together and replace their rows in one
+    transaction. `pending` holds (source_uuid, park_uuid, relevance_tags,
+    content_hash, [(chunk_type, chunk), ...]) tuples. Runs in the command's
+    process or in a pool worker; returns counts for the command to aggregate.
+    """
+    result = {"rewritten": 0, "failed": 0, "rows": 0, "encode": 0.0, "write": 0.0, "touched_parks": set(), "error": None}
+    texts = [chunk for *_, pieces in pending for _, chunk in pieces]
+    started = time.perf_counter()
+    try:
+        embeddings = encode_sorted(texts, batch_size)
+    except Exception as e:
+        result["failed"] = len(pending)
+        result["error"] = f"Embedding failed for {len(pending)} {source_type} records: {e}"
+        return result
+    result["encode"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = []
+    for source_uuid, park_uuid, relevance_tags, content_hash, pieces in pending:
+        for i, (chunk_type, chunk) in enumerate(pieces):
+            rows.append(TextChunk(
+                source_type=source_type,
+                source_uuid=source_uuid,
+                park_uuid=park_uuid,
+                chunk_index=i,
+                chunk_text=chunk,
+                chunk_type=chunk_type,
+                relevance_tags=relevance_tags if chunk_type in relevance_tags else relevance_tags + [chunk_type],
+                context_line=render_context_line(source_type, chunk_type, chunk),
+                content_hash=content_hash,
+            ))
+    for row, embedding, token_count in zip(rows, embeddings, count_tokens_batch([row.context_line for row in rows])):
+        row.embedding = embedding.tolist()
+        row.token_count = token_count
+
+    with transaction.atomic():
+        old_chunks = TextChunk.objects.filter(source_type=source_type, source_uuid__in=[item[0] for item in pending])
+        # A record that moved parks invalidates the old park's answers too
+        result["touched_parks"].update(old_chunks.exclude(park_uuid=None).values_list("park_uuid", flat=True).distinct())
+        old_chunks.delete()
+        TextChunk.objects.bulk_create(rows, batch_size=write_batch_size)
+    result["write"] = time.perf_counter() - started
+
+    result["touched_parks"].update(park_uuid for _, park_uuid, *_ in pending if park_uuid)
+    result["rewritten"] = len(pending)
+    result["rows"] = len(rows)
+    return result
+
 class Command(BaseCommand):
-    help = "Chunk and embed Alerts, Campgrounds, and Parks using all-MiniLM-L6-v2"
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write("🔍 Loading embedding model...")
-        model = SentenceTransformer("all-MiniLM-L6-v2", cache_folder="/tmp/huggingface")
-
-        # === Alerts ===
-        self.stdout.write("⚙️ Embedding Alerts...")
-        for alert in tqdm(Alert.objects.all(), desc="Processing Alerts"):
-            TextChunk.objects.filter(source_type="alert", source_uuid=alert.uuid).delete()
-
-            try:
-                park = Park_Data.objects.get(park_code=alert.park_code)
-                park_name = park.full_name or park.name
-                park_uuid = park.uuid
-            except Park_Data.DoesNotExist:
-                park_name = "Unknown Park"
-                park_uuid = None
-
-            text = "\n".join(filter(None, [
-                f"[Alert] {alert.title}",
-                f"Park: {park_name}",
-                alert.description,
-                f"Category: {alert.category}",
-                alert.url,
-            ]))
-
-            chunks = chunk_text(text)
-            if not chunks:
+    help = "Chunk and embed the Alerts, Campgrounds, and Parks that changed since the last run, using all-MiniLM-L6-v2"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Re-embed every record, even if unchanged")
+        parser.add_argument("--batch-size", type=int, default=64, help="Chunks per encode call (chunks are sorted by length first)")
+        parser.add_argument("--write-batch-size", type=int, default=1000, help="Rows per bulk_create INSERT")
+        parser.add_argument("--workers", type=int, default=1, help="Processes encoding and writing batches in parallel")
+        parser.add_argument("--threads-per-worker", type=int, default=None,
+                            help="Torch/ONNX threads per worker process (default: cores / workers)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.batch_size = options["batch_size"]
+        self.write_batch_size = options["write_batch_size"]
+        if get_embedding_service_client():
+            self.stdout.write(f"🔌 Encoding through embedding service at {settings.EMBEDDING_SERVICE_SOCKET}")
+
+        # An interrupted run is resumed, unless it was incremental and --full is asked for now
+        checkpoint = load_checkpoint()
+        if checkpoint and (checkpoint["full"] or not options["full"]):
+            self.stdout.write(f"⏯️ Resuming run started at {checkpoint['started_at']}")
+        else:
+            checkpoint = {"full": options["full"], "started_at": timezone.now().isoformat(), "done": [], "touched_parks": [], "changed": False}
+            save_checkpoint(checkpoint)
+        self.checkpoint = checkpoint
+        self.started_at = parse_datetime(checkpoint["started_at"])
+
+        # Parks whose chunks were rewritten; their cached chat answers are invalidated at the end
+        self.touched_parks = {uuid.UUID(park_uuid) for park_uuid in checkpoint["touched_parks"]}
+        self.counts = Counter()
+        self.seconds = Counter()
+
+        self.pool = None
+        self.in_flight = set()
+        self.max_in_flight = 1
+        self.flush_chunks = FLUSH_CHUNKS
+        workers = max(options["workers"], 1)
+        if workers > 1:
+            threads = options["threads_per_worker"] or max((os.cpu_count() or 1) // workers, 1)
+            self.stdout.write(f"🧵 {workers} worker processes x {threads} threads")
+            # spawn, not fork: torch and open DB connections don't survive forking
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=embedding_pool.init_worker,
+                initargs=(threads,),
+            )
+            self.max_in_flight = workers * 2
+            # Smaller groups, so even a short phase is spread over every worker
+            self.flush_chunks = min(FLUSH_CHUNKS, self.batch_size * 8)
+        # One bar for the batches written by every process
+        self.progress = tqdm(desc="Chunks embedded", unit="chunk")
+
+        try:
+            self.run_phases()
+        finally:
+            self.progress.close()
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+
+        if checkpoint["changed"] or checkpoint["full"]:
+            for park_uuid in self.touched_parks:
+                bump_data_version(park_chunks_version_name(park_uuid))
+            bump_data_version(ALL_CHUNKS_VERSION)
+
+            if settings.RETRIEVAL_BACKEND == "numpy":
+                self.stdout.write("📦 Exporting vector index...")
+                version = export_vector_index()
+                self.stdout.write(f"Published vector index version {version}")
+
+        os.remove(settings.EMBEDDING_CHECKPOINT_FILE)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"📊 {self.counts['rewritten']} records re-embedded, {self.counts['unchanged']} unchanged, "
+            f"{self.counts['failed']} failed, {self.counts['orphans']} orphaned chunks deleted"
+        )
+        self.stdout.write(
+            f"📊 {self.counts['rows']} chunks written in {elapsed:.1f} s ({self.counts['rows'] / elapsed:.1f} rows/s); "
+            f"encoding {self.seconds['encode']:.1f} s, writing {self.seconds['write']:.1f} s"
+            + (" (summed over workers)" if options["workers"] > 1 else "")
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Embedding complete."))
+
+    def run_phases(self):
+        self.parks = park_lookup()
+        phases = [
+            ("alert", "Alerts", Alert.objects.only(*ALERT_FIELDS), self.alert_texts),
+            ("campground", "Campgrounds", Campground.objects.only(*CAMPGROUND_FIELDS), self.campground_texts),
+            ("park_data", "Parks", Park_Data.objects.only(*PARK_FIELDS), self.park_texts),
+        ]
+        for source_type, label, records, build_texts in phases:
+            if source_type in self.checkpoint["done"]:
+                self.stdout.write(f"⏭️ {label} already embedded in this run")
                 continue
+            self.stdout.write(f"⚙️ Embedding {label}...")
+            orphans = self.embed_sources(source_type, label, records, build_texts)
+            # The phase is only done once every batch has landed
+            self.wait_for_batches()
+            self.delete_orphans(source_type, orphans)
+            self.checkpoint["done"].append(source_type)
+            self.save_progress()
+
+    def save_progress(self):
+        self.checkpoint["changed"] = self.checkpoint["changed"] or bool(self.counts["rewritten"] or self.counts["orphans"])
+        self.checkpoint["touched_parks"] = sorted(str(park_uuid) for park_uuid in self.touched_parks)
+        save_checkpoint(self.checkpoint)
+
+    def park_for(self, park_code):
+        return self.parks.get(park_code, ("Unknown Park", None))
+
+    # Each *_texts returns (park_uuid, base relevance tags, {chunk_type: text}) for one record
+    def alert_texts(self, alert):
+        park_name, park_uuid = self.park_for(alert.park_code)
+        relevance_tags = ["alert_info"] + ([f"park_uuid:{str(park_uuid)}"] if park_uuid else [])
+        return park_uuid, relevance_tags, alert_chunk_texts(alert, park_name)
+
+    def campground_texts(self, cg):
+        park_name, park_uuid = self.park_for(cg.park_code)
+        relevance_tags = ["campground_info"] + ([f"park_uuid:{str(park_uuid)}"] if park_uuid else [])
+        return park_uuid, relevance_tags, campground_chunk_texts(cg, park_name)
+
+    def park_texts(self, park):
+        return park.uuid, ["park_info", f"park_uuid:{str(park.uuid)}"], park_chunk_texts(park)
 
-            try:
-                embeddings = model.encode(chunks)
-            except Exception as e:
-                self.stderr.write(f"❌ Embedding failed for alert {alert.id}: {e}")
+    def embed_sources(self, source_type, label, records, build_texts):
+        """
+        Re-embed the records whose content hash changed; return the uuids of
+        sources with stored chunks that no longer exist (the orphans).
+        """
+        stored = stored_sources(source_type)
+        seen = set()
+        pending, pending_chunks = [], 0
+        # Streamed (a server-side cursor on Postgres) so memory stays flat however many records there are
+        records_iter = records.iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        if self.pool is None:
+            records_iter = tqdm(records_iter, total=records.count(), desc=f"Processing {label}")
+        else:
+            # Two live bars would garble each other; the pool's "Chunks embedded" bar is the one that moves
+            self.stdout.write(f"Processing {label}...")
+        for record in records_iter:
+            seen.add(record.uuid)
+            park_uuid, relevance_tags, texts = build_texts(record)
+            content_hash = source_content_hash(park_uuid, texts)
+
+            stored_hash, written = stored.get(record.uuid, (None, None))
+            # A --full run only skips records it already rewrote before being interrupted
+            if stored_hash == content_hash and (not self.checkpoint["full"] or written >= self.started_at):
+                self.counts["unchanged"] += 1
                 continue
 
-            relevance_tags = ["alert_info"]
-            if park_uuid:
-                relevance_tags.append(f"park_uuid:{str(park_uuid)}")
-
-            with transaction.atomic():
-                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                    TextChunk.objects.create(
-                        source_type="alert",
-                        source_uuid=alert.uuid,
-                        chunk_index=i,
-                        chunk_text=chunk,
-                        embedding=embedding.tolist(),
-                        chunk_type="alert_info",
-                        relevance_tags=relevance_tags,
-                    )
-
-        # === Campgrounds ===
-        self.stdout.write("⚙️ Embedding Campgrounds...")
-        for cg in tqdm(Campground.objects.all(), desc="Processing Campgrounds"):
-            TextChunk.objects.filter(source_type="campground", source_uuid=cg.uuid).delete()
-
-            try:
-                park = Park_Data.objects.get(park_code=cg.park_code)
-                park_name = park.full_name or park.name
-                park_uuid = park.uuid
-            except Park_Data.DoesNotExist:
-                park_name = "Unknown Park"
-                park_uuid = None
-
-            campground_chunks = {
-                "overview": f"[Campground] {cg.name}\nPark: {park_name}\n{cg.description}",
-                "directions": f"Directions: {cg.directions_overview}",
-                "accessibility": f"Wheelchair Access: {cg.wheelchair_access}\nRV Info: {cg.rv_info}",
-                "amenities": f"Amenities: Cell = {cg.cell_phone_info}, Internet = {cg.internet_info}",
-                "fire_policy": f"Fire Policy: {cg.fire_stove_policy}",
-            }
-
-            relevance_tags_base = ["campground_info"]
-            if park_uuid:
-                relevance_tags_base.append(f"park_uuid:{str(park_uuid)}")
-
-            chunk_index = 0
-            for chunk_type, raw_text in campground_chunks.items():
-                chunks = chunk_text(raw_text)
-                if not chunks:
-                    continue
-
-                try:
-                    embeddings = model.encode(chunks)
-                except Exception as e:
-                    self.stderr.write(f"❌ Embedding failed for campground {cg.id}: {e}")
-                    continue
-
-                with transaction.atomic():
-                    for chunk in zip(chunks, embeddings):
-                        TextChunk.objects.create(
-                            source_type="campground",
-                            source_uuid=cg.uuid,
-                            chunk_index=chunk_index,
-                            chunk_text=chunk[0],
-                            embedding=chunk[1].tolist(),
-                            chunk_type=chunk_type,
-                            relevance_tags=relevance_tags_base + [chunk_type],
-                        )
-                        chunk_index += 1
-
-        # === Parks ===
-        self.stdout.write("⚙️ Embedding Parks...")
-        for park in tqdm(Park_Data.objects.all(), desc="Processing Parks"):
-            TextChunk.objects.filter(source_type="park_data", source_uuid=park.uuid).delete()
-
-            activity_str = ", ".join(park.activity_names or [])
-            topic_str = ", ".join(park.topic_names or [])
-
-            park_chunks = {
-                "overview": f"[Park] {park.full_name or park.name}\n{park.description}",
-                "activities_topics": f"Activities: {activity_str}\nTopics: {topic_str}",
-                "directions": f"Directions: {park.directions_info}",
-                "weather": f"Weather Info: {park.weather_info}",
-                "fees": f"Entrance Fee: {park.entrance_fee_title} - {park.entrance_fee_description} (${park.entrance_fee_cost})",
-                "pass": f"Entrance Pass: {park.entrance_pass_title} - {park.entrance_pass_description} (${park.entrance_pass_cost})",
-                "contact": f"Contact: {park.phone_number} ({park.phone_type}), Email: {park.email}",
-                "address": f"Address: {park.mailing_address_line1}, {park.mailing_city}, {park.mailing_state} {park.mailing_postal_code}",
-            }
-
-            relevance_tags_base = ["park_info", f"park_uuid:{str(park.uuid)}"]
-
-            chunk_index = 0
-            for chunk_type, raw_text in park_chunks.items():
-                chunks = chunk_text(raw_text)
-                if not chunks:
-                    continue
-
-                try:
-                    embeddings = model.encode(chunks)
-                except Exception as e:
-                    self.stderr.write(f"❌ Embedding failed for park {park.id}: {e}")
-                    continue
-
-                with transaction.atomic():
-                    for chunk in zip(chunks, embeddings):
-                        TextChunk.objects.create(
-                            source_type="park_data",
-                            source_uuid=park.uuid,
-                            chunk_index=chunk_index,
-                            chunk_text=chunk[0],
-                            embedding=chunk[1].tolist(),
-                            chunk_type=chunk_type,
-                            relevance_tags=relevance_tags_base + [chunk_type],
-                        )
-                        chunk_index += 1
+            pieces = [(chunk_type, chunk) for chunk_type, raw_text in texts.items() for chunk in chunk_text(raw_text)]
+            if not pieces and written is None:
+                # Nothing to embed and nothing stored
+                self.counts["unchanged"] += 1
+                continue
 
-        self.stdout.write(self.style.SUCCESS("✅ Embedding complete."))
+            pending.append((record.uuid, park_uuid, relevance_tags, content_hash, pieces))
+            pending_chunks += len(pieces)
+            if pending_chunks >= self.flush_chunks:
+                self.flush(source_type, pending)
+                pending, pending_chunks = [], 0
+
+        if pending:
+            self.flush(source_type, pending)
+        return set(stored) - seen
+
+    def flush(self, source_type, pending):
+        """Embed and write a group of records, here or in the pool."""
+        if self.pool is None:
+            self.record_result(embed_and_write(source_type, pending, self.batch_size, self.write_batch_size))
+            return
+        # Bound the queued batches so pending chunk texts don't pile up in memory
+        while len(self.in_flight) >= self.max_in_flight:
+            self.wait_for_batches(FIRST_COMPLETED)
+        self.in_flight.add(self.pool.submit(embedding_pool.embed_and_write, source_type, pending, self.batch_size, self.write_batch_size))
+
+    def wait_for_batches(self, return_when=ALL_COMPLETED):
+        if not self.in_flight:
+            return
+        done, self.in_flight = wait(self.in_flight, return_when=return_when)
+        for future in done:
+            self.record_result(future.result())
+
+    def record_result(self, result):
+        if result["error"]:
+            self.stderr.write(f"❌ {result['error']}")
+        for name in ("rewritten", "failed", "rows"):
+            self.counts[name] += result[name]
+        for name in ("encode", "write"):
+            self.seconds[name] += result[name]
+        self.touched_parks.update(result["touched_parks"])
+        self.progress.update(result["rows"])
+        self.save_progress()
+
+    def delete_orphans(self, source_type, orphan_uuids):
+        """Delete the chunks of the `source_type` sources in `orphan_uuids`, in fixed-size batches."""
+        chunks = TextChunk.objects.filter(source_type=source_type)
+        batches = []
+        if None in orphan_uuids:
+            batches.append(chunks.filter(source_uuid=None))
+        orphan_uuids = sorted(uuid for uuid in orphan_uuids if uuid is not None)
+        for start in range(0, len(orphan_uuids), DELETE_BATCH_SIZE):
+            batches.append(chunks.filter(source_uuid__in=orphan_uuids[start:start + DELETE_BATCH_SIZE]))
+
+        for orphans in batches:
+            self.touched_parks.update(orphans.exclude(park_uuid=None).values_list("park_uuid", flat=True).distinct())
+            deleted, _ = orphans.delete()
+            self.counts["orphans"] += deleted
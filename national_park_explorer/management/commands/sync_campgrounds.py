@@ -1,6 +1,6 @@
-import requests
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from national_park_explorer import http_client
 from national_park_explorer.models import Campground
 from datetime import datetime
 from django.utils.timezone import make_aware
@@ -28,7 +28,7 @@ class Command(BaseCommand):
                 "start": start,
             }
 
-            response = requests.get(endpoint, params=params)
+            response = http_client.get(endpoint, params=params)
             if response.status_code != 200:
                 self.stderr.write(f"❌ API error: {response.status_code}")
                 break
@@ -1,4 +1,3 @@
-import requests
 import os
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
@@ -19,6 +18,7 @@ IMAGE_SIZES = {
     'large': (1600, 1200),
 }
 
+from national_park_explorer import http_client
 from national_park_explorer.models import (
     SyncLog,
     Park, Activity, Topic,
@@ -198,7 +198,7 @@ class Command(BaseCommand):
             retries = 3
             for attempt in range(retries):
                 try:
-                    response = requests.get(image_url, timeout=10)
+                    response = http_client.get(image_url, timeout=10)
                     response.raise_for_status()
 
                     original_filename = os.path.basename(image_url).split("?")[0]
@@ -222,7 +222,7 @@ class Command(BaseCommand):
     
     def fetch_parks_from_api(self, test=False):
             url = f"{API_URL}&parkCode=yell" if test else API_URL
-            response = requests.get(url, headers={"X-Api-Key": API_KEY})
+            response = http_client.get(url, headers={"X-Api-Key": API_KEY})
             response.raise_for_status()
             return response.json().get("data", [])
         
@@ -273,7 +273,7 @@ class Command(BaseCommand):
     def warm_cache(self):
         try:
             url = 'http://django-api:8000/getParks?start=0&limit=500&sort=fullName&stateCode='
-            response = requests.get(url, timeout=10)
+            response = http_client.get(url, timeout=10)
             if response.status_code == 200:
                 print("✅ Cache warmed successfully.")
             else:
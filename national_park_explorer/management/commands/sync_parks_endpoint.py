@@ -1,9 +1,11 @@
 # national_park_explorer/management/commands/sync_parks_endpoint.py
 
-import requests
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from national_park_explorer import http_client
 from national_park_explorer.models import Park_Data
+from national_park_explorer.park_matcher import PARK_DATA_VERSION
+from national_park_explorer.versioning import bump_data_version
 from datetime import datetime
 from django.utils.timezone import make_aware
 import traceback
@@ -30,7 +32,7 @@ class Command(BaseCommand):
                 "start": start,
             }
 
-            response = requests.get(endpoint, params=params)
+            response = http_client.get(endpoint, params=params)
             if response.status_code != 200:
                 self.stderr.write(f"❌ API error: {response.status_code}")
                 break
@@ -152,6 +154,9 @@ class Command(BaseCommand):
             start += limit
             self.stdout.write(f"✅ Imported {len(parks)} parks (total so far: {total_imported})")
 
+        # Tell web workers to rebuild their park-name matcher
+        bump_data_version(PARK_DATA_VERSION)
+
         self.stdout.write(self.style.SUCCESS(f"🎉 Finished syncing {total_imported} parks."))
         if total_failed > 0:
             self.stderr.write(self.style.WARNING(f"⚠️ {total_failed} parks failed to import."))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-16 09:12
+
+from django.db import migrations
+import pgvector.django
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('national_park_explorer', '0010_textchunk_relevance_tags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='textchunk',
+            name='embedding',
+            field=pgvector.django.VectorField(dimensions=384),
+        ),
+        migrations.AddIndex(
+            model_name='textchunk',
+            index=pgvector.django.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='textchunk_embedding_hnsw', opclasses=['vector_ip_ops']),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+PARK_UUID_TAG_PREFIX = 'park_uuid:'
+
+
+def backfill_park_uuid(apps, schema_editor):
+    TextChunk = apps.get_model('national_park_explorer', 'TextChunk')
+    batch = []
+    for chunk in TextChunk.objects.only('id', 'relevance_tags').iterator(chunk_size=2000):
+        park_uuid = next(
+            (tag[len(PARK_UUID_TAG_PREFIX):] for tag in chunk.relevance_tags or [] if tag.startswith(PARK_UUID_TAG_PREFIX)),
+            None,
+        )
+        if park_uuid:
+            chunk.park_uuid = park_uuid
+            batch.append(chunk)
+        if len(batch) >= 2000:
+            TextChunk.objects.bulk_update(batch, ['park_uuid'])
+            batch = []
+    if batch:
+        TextChunk.objects.bulk_update(batch, ['park_uuid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('national_park_explorer', '0011_alter_textchunk_embedding_textchunk_embedding_hnsw'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textchunk',
+            name='park_uuid',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_park_uuid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+def backfill_context_line(apps, schema_editor):
+    # token_count needs the LLM tokenizer, so it is left for run_embedding_task;
+    # until then /api/ask counts those rows on the fly.
+    TextChunk = apps.get_model('national_park_explorer', 'TextChunk')
+    batch = []
+    for chunk in TextChunk.objects.only('id', 'source_type', 'chunk_type', 'chunk_text').iterator(chunk_size=2000):
+        content = chunk.chunk_text.strip().replace("\n", " ")
+        chunk.context_line = f"[{chunk.source_type.upper()} - {chunk.chunk_type or 'general'}]: {content}"
+        batch.append(chunk)
+        if len(batch) >= 2000:
+            TextChunk.objects.bulk_update(batch, ['context_line'])
+            batch = []
+    if batch:
+        TextChunk.objects.bulk_update(batch, ['context_line'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('national_park_explorer', '0012_textchunk_park_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textchunk',
+            name='context_line',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='textchunk',
+            name='token_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_context_line, migrations.RunPython.noop),
+    ]
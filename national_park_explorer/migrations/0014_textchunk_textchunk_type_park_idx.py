@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('national_park_explorer', '0013_textchunk_context_line_textchunk_token_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='textchunk',
+            index=models.Index(fields=['chunk_type', 'park_uuid'], name='textchunk_type_park_idx'),
+        ),
+    ]
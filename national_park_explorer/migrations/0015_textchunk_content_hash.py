@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('national_park_explorer', '0014_textchunk_textchunk_type_park_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='textchunk',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -8,7 +8,7 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
 from django.core.files.base import ContentFile
-from pgvector.django import VectorField
+from pgvector.django import VectorField, HnswIndex
 from django.contrib.postgres.fields import ArrayField
 
 # Constants
@@ -18,6 +18,7 @@ IMAGE_SIZES = {
     "medium": (800, 800),
     "large": (1600, 1600),
 }
+EMBEDDING_DIMENSIONS = 384  # all-MiniLM-L6-v2
 
 # ---------- Custom User ----------
 class CustomUser(AbstractUser):
@@ -415,11 +416,17 @@ class TextChunk(models.Model):
 
     source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES)
     source_uuid = models.UUIDField(null=True, blank=True)
+    park_uuid = models.UUIDField(null=True, blank=True, db_index=True)  # Park_Data.uuid the chunk belongs to
     chunk_index = models.IntegerField()
     chunk_text = models.TextField()
-    embedding = VectorField()
+    embedding = VectorField(dimensions=EMBEDDING_DIMENSIONS)
     chunk_type = models.CharField(max_length=50, blank=True, null=True)
     relevance_tags = ArrayField(models.CharField(max_length=50), default=list, blank=True)
+    # Pre-rendered "[SOURCE - type]: text" context line and its length in LLM tokens
+    context_line = models.TextField(blank=True, default="")
+    token_count = models.PositiveIntegerField(null=True, blank=True)
+    # Hash of everything the source record's chunks were built from; run_embedding_task skips unchanged sources
+    content_hash = models.CharField(max_length=64, blank=True, default="")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -427,6 +434,16 @@ class TextChunk(models.Model):
         unique_together = ('source_type', 'source_uuid', 'chunk_index')
         indexes = [
             models.Index(fields=['source_type', 'source_uuid']),
+            # Per-chunk-type retrieval (RETRIEVAL_MODE = "per_type"), optionally within one park
+            models.Index(fields=['chunk_type', 'park_uuid'], name='textchunk_type_park_idx'),
+            # ANN index for `embedding <#> query` (negative inner product) lookups
+            HnswIndex(
+                name='textchunk_embedding_hnsw',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_ip_ops'],
+            ),
         ]
 
     def __str__(self):
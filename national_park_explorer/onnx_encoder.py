@@ -0,0 +1,84 @@
+"""
+ONNX Runtime implementation of the all-MiniLM-L6-v2 sentence encoder.
+
+Runs an exported (optionally int8 dynamically quantized) copy of the
+transformer produced by `manage.py export_onnx_encoder`, then applies the same
+mean pooling and L2 normalisation as the sentence-transformers pipeline. It
+exposes an `encode()` compatible with SentenceTransformer.encode for the
+arguments this project uses, so it can stand in for the torch model anywhere.
+"""
+
+import os
+
+import numpy as np
+
+MODEL_FILENAME = "model.onnx"
+QUANTIZED_MODEL_FILENAME = "model-int8.onnx"
+TOKENIZER_FILENAME = "tokenizer.json"
+MAX_SEQ_LENGTH = 256  # same as the sentence-transformers config for all-MiniLM-L6-v2
+
+# Representative chunk texts and questions for ONNX/torch parity checks (same shapes run_embedding_task produces)
+PARITY_TEXTS = [
+    "[Park] Yellowstone National Park\nOn March 1, 1872, Yellowstone became the first national park for all to enjoy the unique hydrothermal wonders.",
+    "Activities: Hiking, Camping, Fishing, Wildlife Watching, Stargazing\nTopics: Geology, Volcanoes, Hot Springs",
+    "Directions: Zion National Park is located along State Route 9 in Springdale, Utah. From I-15 take exit 16.",
+    "Weather Info: Acadia's weather is variable; summer highs reach the 80s while winters bring snow and ice.",
+    "Entrance Fee: Private Vehicle - Admits one private vehicle and all occupants for 7 days ($35.00)",
+    "Entrance Pass: Annual Park Pass - Valid for 12 months from the month of purchase ($70.00)",
+    "Contact: 3077357000 (Voice), Email: yell_visitor_services@nps.gov",
+    "Address: PO Box 168, Yellowstone National Park, WY 82190",
+    "[Campground] Mather Campground\nPark: Grand Canyon National Park\nMather Campground is located in Grand Canyon Village on the South Rim.",
+    "Fire Policy: Campfires are permitted in provided fire rings only. Check current fire restrictions before arrival.",
+    "[Alert] Road closure on Going-to-the-Sun Road\nPark: Glacier National Park\nThe alpine section is closed for snow removal.",
+    "What are the best things to do in Yosemite?",
+    "How much does it cost to enter Great Smoky Mountains?",
+    "Can I bring an RV to campgrounds in Rocky Mountain National Park?",
+]
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir, quantized=False, threads=None, max_length=MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILENAME))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        model_file = QUANTIZED_MODEL_FILENAME if quantized else MODEL_FILENAME
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batches.append(self._encode_batch(texts[start:start + batch_size], normalize_embeddings))
+        vectors = np.concatenate(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, texts, normalize):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
@@ -0,0 +1,137 @@
+"""
+Park-name matching for chat questions.
+
+Builds an Aho-Corasick automaton over every Park_Data `name`/`full_name` once
+per worker, so matching a question is a single pass over its characters
+instead of a full-table fetch and two substring checks per park. The
+automaton is rebuilt when the "park_data" version key or the table's
+signature (row count, highest id and latest `last_updated`, one aggregate
+query) changes. The signature covers `sync_parks_endpoint` runs in another
+process, whose version bump never reaches the web workers with a per-process
+cache; it is re-read at most once per SIGNATURE_CHECK_INTERVAL per worker, so
+chats don't pay for the aggregate.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+from django.db.models import Count, Max
+
+from .models import Park_Data
+from .versioning import get_data_version
+
+PARK_DATA_VERSION = "park_data"
+SIGNATURE_CHECK_INTERVAL = 60  # seconds
+
+ParkMatch = namedtuple("ParkMatch", ["park_code", "uuid", "name"])
+
+
+class ParkNameMatcher:
+    def __init__(self, patterns):
+        """`patterns` is an iterable of (text, payload) pairs; matching is case-insensitive."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]  # (length, payload) of the longest pattern ending at each node
+
+        for text, payload in patterns:
+            text = (text or "").strip().lower()
+            if not text:
+                continue
+            node = 0
+            for char in text:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = next_node
+            if self.best[node] is None or len(text) > self.best[node][0]:
+                self.best[node] = (len(text), payload)
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        # Depth-1 nodes fail back to the root, which is already the default
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+
+                # A node also "ends" every pattern that ends at its failure target
+                inherited = self.best[self.fail[child]]
+                if inherited and (self.best[child] is None or inherited[0] > self.best[child][0]):
+                    self.best[child] = inherited
+
+    def longest_match(self, text):
+        """Return the payload of the longest pattern occurring in `text`, or None."""
+        node = 0
+        best = None
+        for char in text.lower():
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found = self.best[node]
+            if found and (best is None or found[0] > best[0]):
+                best = found
+        return best[1] if best else None
+
+
+_matcher = None
+_matcher_version = None
+_matcher_lock = threading.Lock()
+_signature = None
+_signature_checked_at = 0.0
+
+
+def build_park_matcher():
+    patterns = []
+    for park_code, park_uuid, full_name, name in Park_Data.objects.values_list("park_code", "uuid", "full_name", "name"):
+        match = ParkMatch(park_code=park_code, uuid=park_uuid, name=full_name or name)
+        patterns.append((full_name, match))
+        patterns.append((name, match))
+    return ParkNameMatcher(patterns)
+
+
+def park_data_signature():
+    stats = Park_Data.objects.aggregate(count=Count("id"), max_id=Max("id"), updated=Max("last_updated"))
+    return stats["count"], stats["max_id"], stats["updated"]
+
+
+def recent_park_data_signature():
+    """park_data_signature(), re-queried at most once per SIGNATURE_CHECK_INTERVAL."""
+    global _signature, _signature_checked_at
+
+    now = time.monotonic()
+    if _signature is None or now - _signature_checked_at >= SIGNATURE_CHECK_INTERVAL:
+        _signature = park_data_signature()
+        _signature_checked_at = now
+    return _signature
+
+
+def get_park_matcher():
+    global _matcher, _matcher_version
+
+    version = (get_data_version(PARK_DATA_VERSION), recent_park_data_signature())
+    if _matcher is not None and version == _matcher_version:
+        return _matcher
+
+    with _matcher_lock:
+        if _matcher is None or version != _matcher_version:
+            _matcher = build_park_matcher()
+            _matcher_version = version
+    return _matcher
+
+
+def match_park(question):
+    """Return the ParkMatch for the longest park name in `question`, or None."""
+    if not question:
+        return None
+    return get_park_matcher().longest_match(question)
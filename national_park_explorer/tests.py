@@ -1,3 +1,173 @@
-from django.test import TestCase
+import os
+import unittest
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .admission import fair_order
+from .llm_relay import TokenTextScanner
+from .llm_status import LLMReadinessWait
+from .onnx_encoder import MODEL_FILENAME, PARITY_TEXTS, QUANTIZED_MODEL_FILENAME
+from .park_matcher import ParkNameMatcher
+from .views import merge_ranked_chunks
+
+
+class OnnxEncoderParityTests(SimpleTestCase):
+    """The ONNX encoder must produce (nearly) the torch model's embeddings; skipped without an export."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        try:
+            import onnxruntime  # noqa: F401
+            import sentence_transformers  # noqa: F401
+        except ImportError as e:
+            raise unittest.SkipTest(f"ONNX Runtime or sentence-transformers not installed: {e}")
+        if not os.path.exists(os.path.join(settings.ONNX_ENCODER_DIR, MODEL_FILENAME)):
+            raise unittest.SkipTest("No ONNX export; run `manage.py export_onnx_encoder` first")
+
+        from .embeddings import load_embedding_model
+        try:
+            torch_model = load_embedding_model("torch")
+        except OSError as e:
+            raise unittest.SkipTest(f"Torch model unavailable: {e}")
+        cls.reference = np.asarray(torch_model.encode(PARITY_TEXTS, normalize_embeddings=True), dtype=np.float32)
+
+    def assertParity(self, quantized, min_cosine):
+        from .onnx_encoder import OnnxEncoder
+
+        encoder = OnnxEncoder(settings.ONNX_ENCODER_DIR, quantized=quantized)
+        vectors = np.asarray(encoder.encode(PARITY_TEXTS, normalize_embeddings=True), dtype=np.float32)
+        self.assertEqual(vectors.shape, self.reference.shape)
+        cosines = (vectors * self.reference).sum(axis=1)
+        self.assertGreaterEqual(cosines.min(), min_cosine)
+
+        # A single string comes back as one vector, as with SentenceTransformer.encode
+        np.testing.assert_allclose(encoder.encode(PARITY_TEXTS[0]), vectors[0], atol=1e-5)
+
+    def test_fp32_matches_torch(self):
+        self.assertParity(quantized=False, min_cosine=0.999)
+
+    def test_int8_matches_torch(self):
+        if not os.path.exists(os.path.join(settings.ONNX_ENCODER_DIR, QUANTIZED_MODEL_FILENAME)):
+            self.skipTest("No quantized export")
+        self.assertParity(quantized=True, min_cosine=0.99)
+
+
+class LLMReadinessWaitTests(SimpleTestCase):
+    def state(self, status, checked_at, **extra):
+        return {"status": status, "checked_at": checked_at, "llm_ip": None, "healthy": None, "message": None, **extra}
+
+    def test_cold_start_is_only_known_once_a_probe_says_so(self):
+        wait = LLMReadinessWait(timeout=60)
+
+        # The prober has only just been started: no state yet
+        self.assertEqual(wait.observe(None), [])
+        self.assertFalse(wait.cold_start)
+
+        events = wait.observe(self.state("starting", 1.0))
+        self.assertEqual(events, [{"event": "starting", "attempt": 1}])
+        self.assertTrue(wait.cold_start)
+        self.assertFalse(wait.done)
+
+        # The same probe result isn't reported twice
+        self.assertEqual(wait.observe(self.state("starting", 1.0)), [])
+
+        events = wait.observe(self.state("ready", 2.0, llm_ip="10.0.0.5", healthy=True))
+        self.assertEqual(events, [{"event": "ready"}])
+        self.assertTrue(wait.done)
+        self.assertEqual(wait.llm_ip, "10.0.0.5")
+
+    def test_ready_server_is_not_a_cold_start(self):
+        wait = LLMReadinessWait(timeout=60)
+        wait.observe(self.state("ready", 1.0, llm_ip="10.0.0.5", healthy=True))
+        self.assertFalse(wait.cold_start)
+
+
+class TokenTextScannerTests(SimpleTestCase):
+    def test_lines_split_across_chunks(self):
+        stream = b'{"event": "token", "text": "Hel"}\n{"event": "token", "text": "lo \\u00e9"}\n'
+        scanner = TokenTextScanner()
+
+        # Nothing is relayed until a line is complete
+        self.assertEqual(scanner.feed(stream[:10]), b"")
+        self.assertEqual(scanner.feed(stream[10:]), stream)
+        self.assertEqual(scanner.flush(), b"")
+        self.assertEqual(scanner.tokens, 2)
+        self.assertEqual(scanner.text, "Hello \u00e9")
+        self.assertFalse(scanner.errored)
+
+    def test_final_trailer_replaces_token_text(self):
+        scanner = TokenTextScanner()
+        scanner.feed(b'{"event": "token", "text": "Hi"}\n{"event": "final", "text": "Hi there"}')
+        self.assertEqual(scanner.flush(), b'{"event": "final", "text": "Hi there"}\n')
+        self.assertEqual(scanner.text, "Hi there")
+
+    def test_error_event(self):
+        scanner = TokenTextScanner()
+        scanner.feed(b'{"event": "token", "text": "Hi"}\n{"event": "error", "message": "boom"}\n')
+        self.assertTrue(scanner.errored)
+
+
+class ParkNameMatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.matcher = ParkNameMatcher([
+            ("Glacier", "glacier"),
+            ("Glacier Bay", "glacier_bay"),
+            ("Bay", "bay"),
+            ("Zion", "zion"),
+            ("", "ignored"),
+        ])
+
+    def test_longest_name_wins(self):
+        self.assertEqual(self.matcher.longest_match("Kayaking in GLACIER BAY national park"), "glacier_bay")
+        self.assertEqual(self.matcher.longest_match("Hiking in Glacier"), "glacier")
+
+    def test_match_anywhere_in_question(self):
+        self.assertEqual(self.matcher.longest_match("Is Zion open in winter?"), "zion")
+        self.assertIsNone(self.matcher.longest_match("What is the weather like?"))
+
+
+class FairOrderTests(SimpleTestCase):
+    def entry(self, client, ticket):
+        return {"client": client, "ticket": ticket, "beat": 0}
+
+    def test_round_robin_across_clients(self):
+        queue = [self.entry("a", 1), self.entry("a", 2), self.entry("b", 3)]
+        self.assertEqual([e["ticket"] for e in fair_order(queue)], [1, 3, 2])
+
+    def test_active_chats_count_as_first_turns(self):
+        queue = [self.entry("a", 1), self.entry("a", 2), self.entry("b", 3)]
+        # b already streams one chat, so its queued chat is its second
+        self.assertEqual([e["ticket"] for e in fair_order(queue, active=["b"])], [1, 2, 3])
+
+
+class MergeRankedChunksTests(SimpleTestCase):
+    def chunk(self, chunk_id, type_rank, similarity, source):
+        return SimpleNamespace(id=chunk_id, type_rank=type_rank, similarity=similarity, source_uuid=source)
+
+    def setUp(self):
+        self.chunks = [
+            self.chunk(1, 1, -0.80, "A"),
+            self.chunk(2, 1, -0.85, "B"),
+            self.chunk(3, 1, -0.82, "C"),
+            self.chunk(4, 2, -0.90, "D"),
+            self.chunk(5, 2, -0.60, "E"),  # above abs_threshold
+            self.chunk(6, 3, -0.70, "F"),  # more than max_delta from the best match
+            self.chunk(7, 3, -0.79, "A"),
+        ]
+
+    def test_type_order_with_per_type_quota(self):
+        merged = merge_ranked_chunks(self.chunks, max_per_type=2, k=4)
+        self.assertEqual([c.id for c in merged], [2, 3, 4, 7])
+
+    def test_leftover_room_filled_in_rank_order(self):
+        merged = merge_ranked_chunks(self.chunks, max_per_type=2, k=5)
+        self.assertEqual([c.id for c in merged], [2, 3, 4, 7, 1])
+
+    def test_per_source_limit(self):
+        merged = merge_ranked_chunks(self.chunks, max_per_source=1, max_per_type=2, k=5)
+        # Chunk 1 is a second chunk from source A
+        self.assertEqual([c.id for c in merged], [2, 3, 4, 7])
@@ -0,0 +1,45 @@
+"""
+Per-request stage timings for /api/ask.
+
+A StageTimer collects wall-clock durations (time.perf_counter) per named
+stage. The chat views report them in the debug payload, as a `Server-Timing`
+header on non-streaming responses, as the final `timings` NDJSON event on the
+stream, and as one `chat_timings {...json...}` log line per request.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def record(self, name, elapsed_ms):
+        """Add `elapsed_ms` to stage `name` (stages that run more than once accumulate)."""
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def since(self, started):
+        """Milliseconds since a perf_counter() reading."""
+        return (time.perf_counter() - started) * 1000
+
+    def as_dict(self):
+        timings = {name: round(ms, 2) for name, ms in self.stages.items()}
+        timings["total"] = round(self.since(self.started), 2)
+        return timings
+
+    def server_timing_header(self):
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in self.as_dict().items())
+
+    def log_line(self, **fields):
+        return f"chat_timings {json.dumps({**fields, 'timings': self.as_dict()})}"
@@ -1,12 +1,13 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import index, ask_question, github_chart_data, getWeather, getParks, user_info, favorites, visited, upload_file, get_file_stats, get_geojson, ObtainTokenPairWithClaims, CustomUserCreate, LogoutAndBlacklistRefreshTokenForUserView
+from .views import index, ask_question, ask_question_async, warm_llm_server, github_chart_data, getWeather, getParks, user_info, favorites, visited, upload_file, get_file_stats, get_geojson, ObtainTokenPairWithClaims, CustomUserCreate, LogoutAndBlacklistRefreshTokenForUserView
 from rest_framework_simplejwt import views as jwt_views
 
 urlpatterns = [
     path('', index, name='index'),
-    path('api/ask', ask_question, name='ask-question'),
+    path('api/ask', ask_question_async if settings.ASYNC_CHAT else ask_question, name='ask-question'),
+    path('api/ask/warm', warm_llm_server, name='ask-warm'),
     path('api/githubChart/', github_chart_data, name='github-chart-data'),
     path("getWeather/", getWeather, name="getWeather"),
     path("getParks/", getParks, name="getParks"),
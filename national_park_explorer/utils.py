@@ -1,7 +1,7 @@
 import os
-import requests
 from django.core.files.base import ContentFile
 from .models import ParkImage
+from . import http_client
 
 def download_and_save_image(park, image_data):
     image_url = image_data.get('url')
@@ -9,7 +9,7 @@ def download_and_save_image(park, image_data):
         return
 
     try:
-        response = requests.get(image_url, timeout=10)
+        response = http_client.get(image_url, timeout=10)
         response.raise_for_status()
 
         image_content = ContentFile(response.content)
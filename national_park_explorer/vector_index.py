@@ -0,0 +1,219 @@
+"""
+In-process vector index for TextChunk embeddings.
+
+`export_vector_index()` dumps every TextChunk embedding into a float32 `.npy`
+matrix plus a JSON sidecar (chunk id, source_uuid, chunk_type, park uuid) and
+atomically points `manifest.json` at the new files. Each worker memory-maps the
+current export and answers top-k queries with one matrix-vector product and
+`argpartition`, reloading when the manifest's version changes.
+
+Similarities follow pgvector's `<#>` convention (negative inner product, lower
+is more similar) so results are interchangeable with the SQL path.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import EMBEDDING_DIMENSIONS, TextChunk
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# A worker may have read the previous manifest but not opened its files yet,
+# so old exports are kept for a while after a new one is published
+KEEP_EXPORTS = 3
+STALE_EXPORT_GRACE = 600  # seconds
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def export_vector_index(directory=None, batch_size=5000):
+    """
+    Export all TextChunk embeddings to `directory` and publish them as the
+    current version. Returns the new version string.
+    """
+    directory = directory or settings.VECTOR_INDEX_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    version = f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    matrix_name = f"embeddings-{version}.npy"
+    metadata_name = f"metadata-{version}.json"
+
+    queryset = TextChunk.objects.order_by("id")
+    total = queryset.count()
+
+    matrix = np.lib.format.open_memmap(
+        os.path.join(directory, matrix_name), mode="w+", dtype=np.float32, shape=(total, EMBEDDING_DIMENSIONS)
+    )
+    metadata = {"version": version, "ids": [], "source_uuids": [], "chunk_types": [], "park_uuids": []}
+
+    rows = queryset.values_list("id", "source_uuid", "chunk_type", "park_uuid", "embedding")
+    for i, (chunk_id, source_uuid, chunk_type, park_uuid, embedding) in enumerate(rows.iterator(chunk_size=batch_size)):
+        if i >= total:
+            break  # rows inserted after the count() above wait for the next export
+        matrix[i] = np.asarray(embedding, dtype=np.float32)
+        metadata["ids"].append(chunk_id)
+        metadata["source_uuids"].append(str(source_uuid) if source_uuid else None)
+        metadata["chunk_types"].append(chunk_type)
+        metadata["park_uuids"].append(str(park_uuid) if park_uuid else None)
+
+    exported = len(metadata["ids"])
+    matrix.flush()
+    del matrix
+    if exported < total:
+        # Rows were deleted mid-export; shrink to what we actually wrote
+        trimmed = np.load(os.path.join(directory, matrix_name))[:exported]
+        np.save(os.path.join(directory, matrix_name), trimmed)
+
+    _write_json_atomic(os.path.join(directory, metadata_name), metadata)
+    _write_json_atomic(os.path.join(directory, MANIFEST_NAME), {
+        "version": version,
+        "matrix": matrix_name,
+        "metadata": metadata_name,
+        "count": exported,
+        "dimensions": EMBEDDING_DIMENSIONS,
+    })
+    _remove_stale_exports(directory)
+    logger.info(f"Exported {exported} embeddings to vector index version {version}")
+    return version
+
+
+def _remove_stale_exports(directory):
+    """
+    Delete exports older than the newest KEEP_EXPORTS once they are at least
+    STALE_EXPORT_GRACE seconds old. Workers that already mapped one keep it
+    alive on POSIX; the grace period covers workers that read its manifest but
+    haven't opened the files yet.
+    """
+    files_by_version = defaultdict(list)
+    for name in os.listdir(directory):
+        for prefix in ("embeddings-", "metadata-"):
+            if name.startswith(prefix):
+                # Versions start with a timestamp, so they sort chronologically
+                files_by_version[name[len(prefix):].rsplit(".", 1)[0]].append(name)
+
+    cutoff = time.time() - STALE_EXPORT_GRACE
+    for version in sorted(files_by_version)[:-KEEP_EXPORTS]:
+        for name in files_by_version[version]:
+            path = os.path.join(directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class VectorIndex:
+    def __init__(self, directory, manifest):
+        self.version = manifest["version"]
+        self.matrix = np.load(os.path.join(directory, manifest["matrix"]), mmap_mode="r")
+        with open(os.path.join(directory, manifest["metadata"])) as f:
+            metadata = json.load(f)
+
+        self.ids = np.asarray(metadata["ids"], dtype=np.int64)
+        self.source_uuids = metadata["source_uuids"]
+        self.chunk_types = metadata["chunk_types"]
+
+        rows_by_park = defaultdict(list)
+        for row, park_uuid in enumerate(metadata["park_uuids"]):
+            if park_uuid:
+                rows_by_park[park_uuid].append(row)
+        self.rows_by_park = {key: np.asarray(rows, dtype=np.int64) for key, rows in rows_by_park.items()}
+
+        rows_by_type = defaultdict(list)
+        for row, chunk_type in enumerate(self.chunk_types):
+            rows_by_type[chunk_type].append(row)
+        self.rows_by_type = {key: np.asarray(rows, dtype=np.int64) for key, rows in rows_by_type.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query_embedding, k=20, park_uuid=None):
+        """
+        Return up to `k` (chunk_id, similarity) pairs, most similar first.
+        `similarity` is the negative inner product, as with pgvector's `<#>`.
+        """
+        rows = None
+        if park_uuid is not None:
+            rows = self.rows_by_park.get(str(park_uuid))
+            if rows is None:
+                return []
+        return self._search_rows(np.asarray(query_embedding, dtype=np.float32), k, rows)
+
+    def search_by_type(self, query_embedding, chunk_types, k_per_type=5, park_uuid=None):
+        """
+        Return {chunk_type: [(chunk_id, similarity), ...]} with the top
+        `k_per_type` chunks of each type in `chunk_types`.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        park_rows = None
+        if park_uuid is not None:
+            park_rows = self.rows_by_park.get(str(park_uuid))
+            if park_rows is None:
+                return {chunk_type: [] for chunk_type in chunk_types}
+
+        results = {}
+        for chunk_type in chunk_types:
+            rows = self.rows_by_type.get(chunk_type)
+            if rows is not None and park_rows is not None:
+                rows = np.intersect1d(rows, park_rows, assume_unique=True)
+            results[chunk_type] = self._search_rows(query, k_per_type, rows) if rows is not None else []
+        return results
+
+    def _search_rows(self, query, k, rows=None):
+        scores = self.matrix[rows] @ query if rows is not None else self.matrix @ query
+
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        positions = rows[top] if rows is not None else top
+        return [(int(self.ids[p]), -float(scores[t])) for p, t in zip(positions, top)]
+
+
+_index = None
+_manifest_mtime = None
+_index_lock = threading.Lock()
+
+
+def get_vector_index():
+    """
+    Return this worker's VectorIndex, (re)loading it when a new export has been
+    published. Returns None if nothing has been exported yet.
+    """
+    global _index, _manifest_mtime
+
+    manifest_path = os.path.join(settings.VECTOR_INDEX_DIR, MANIFEST_NAME)
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if mtime == _manifest_mtime and _index is not None:
+        return _index
+
+    with _index_lock:
+        if mtime != _manifest_mtime or _index is None:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if _index is None or manifest["version"] != _index.version:
+                _index = VectorIndex(settings.VECTOR_INDEX_DIR, manifest)
+                logger.info(f"Loaded vector index version {_index.version} ({len(_index)} chunks)")
+            _manifest_mtime = mtime
+    return _index
@@ -0,0 +1,44 @@
+"""
+Cache-backed version keys for derived, per-worker data.
+
+A producer (e.g. a sync command) calls `bump_data_version(name)` after it
+changes the underlying rows; consumers compare `get_data_version(name)` with
+the version they built from and rebuild on mismatch. Version keys only cross
+process boundaries when CACHES points at a shared backend.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Backends whose data is private to one process (or not kept at all)
+PER_PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def shared_cache_configured():
+    """True when the default cache is shared across processes (Redis, Memcached, database, files)."""
+    return settings.CACHES["default"]["BACKEND"] not in PER_PROCESS_CACHE_BACKENDS
+
+
+def _version_key(name):
+    return f"data_version:{name}"
+
+
+def get_data_version(name):
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_data_version(name):
+    version = uuid.uuid4().hex
+    cache.set(_version_key(name), version, timeout=None)
+    return version
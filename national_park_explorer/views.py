@@ -1,12 +1,14 @@
 from django.shortcuts import render
-import requests
 import json
 import gpxpy
 import geojson
 import time
+import asyncio
+import httpx
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from fitparse import FitFile
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.paginator import Paginator
 from django.core.cache import cache
 from django.conf import settings
@@ -18,10 +20,26 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import MyTokenObtainPairSerializer, CustomUserSerializer, ParkSerializer, FileUploadSerializer
-from .models import CustomUser, Favorite, Visited, Park, Park_Data, TextChunk, UploadedFile, Gpx_Activity, Record
+from .models import CustomUser, Favorite, Visited, Park, TextChunk, UploadedFile, Gpx_Activity, Record
+from .vector_index import get_vector_index
+from .park_matcher import match_park
+from .embeddings import embed_query, query_embedding_cache
+from .answer_cache import iter_answer_tokens, lookup_answer, store_answer
+from . import http_client
+from .llm_tokenizer import CONTEXT_LINE_OVERHEAD, MESSAGE_OVERHEAD, count_tokens, render_context_line
+from .timing import StageTimer
+from .llm_relay import TokenTextScanner
+from .llm_status import (
+    LLMReadinessWait, WarmRateLimited, llm_auth_headers, read_llm_state, warm_llm, was_warmed,
+)
+from .admission import SLOT_KEEPALIVE_INTERVAL, AdmissionWait
+from .conversations import load_conversation
+from .instant_answer import build_instant_answer
 from rest_framework.views import APIView
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.tokens import RefreshToken
-from sentence_transformers import SentenceTransformer
 from django.db.models.expressions import RawSQL
 from django.views.decorators.cache import cache_page
 from collections import defaultdict
@@ -30,7 +48,6 @@ import logging
 import xml.etree.ElementTree as ET
 
 logger = logging.getLogger(__name__)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 MAX_CONTEXT_TOKENS = 4096
 EXPECTED_RESPONSE_TOKENS = 1000
 MAX_QUESTION_LENGTH = 1000
@@ -60,15 +77,10 @@ def handler500(request, exception):
 
 
 # AI Chatbot
-# Extract the park code from the user's question (if there is one)
-def get_park_code_from_question(question):
-    q = question.lower()
-    for park in Park_Data.objects.all():
-        if park.full_name and park.full_name.lower() in q:
-            return park.park_code
-        if park.name and park.name.lower() in q:
-            return park.park_code
-    return None
+# Extract the park mentioned in the user's question (if there is one)
+def get_park_from_question(question):
+    """Return a ParkMatch (park_code, uuid, name) for the longest park name in the question, or None."""
+    return match_park(question)
 
 def prune_turns(history, max_turns=3, max_tokens=2000):
     """
@@ -101,7 +113,7 @@ def prune_turns(history, max_turns=3, max_tokens=2000):
     final_history = []
 
     for msg in reversed(pruned_history):  # newest → oldest
-        t = estimate_tokens(msg.get("content", "")) + 4
+        t = count_tokens(msg.get("content", "")) + MESSAGE_OVERHEAD
         if total_tokens + t > max_tokens:
             break
         final_history.append(msg)
@@ -112,22 +124,27 @@ def prune_turns(history, max_turns=3, max_tokens=2000):
     return final_history
 
 
+def chunk_context_line(chunk):
+    return chunk.context_line or render_context_line(chunk.source_type, chunk.chunk_type, chunk.chunk_text)
+
+def chunk_token_count(chunk):
+    # Rows embedded before token_count existed are counted on the fly
+    if chunk.token_count is None:
+        return count_tokens(chunk_context_line(chunk))
+    return chunk.token_count
+
 def select_chunks_within_token_budget(chunks, available_tokens):
     """
-    Select chunks dynamically so that total tokens <= available_tokens,
-    respecting per-source limits (max_per_source) and overall max chunks (k).
+    Select chunks, best first, whose context lines fit in `available_tokens`.
+    A chunk that doesn't fit is skipped so smaller ones further down can still fill the budget.
     """
     selected_chunks = []
     current_tokens = 0
 
-    for i, chunk in enumerate(chunks, start=1):
-        content = chunk.chunk_text.strip().replace("\n", " ")
-        label = f"{chunk.source_type.upper()} - {chunk.chunk_type or 'general'}"
-        line = f"{i}. [{label}]: {content}"
-        line_tokens = estimate_tokens(line) + 1
-
+    for chunk in chunks:
+        line_tokens = chunk_token_count(chunk) + CONTEXT_LINE_OVERHEAD
         if current_tokens + line_tokens > available_tokens:
-            break
+            continue
 
         selected_chunks.append(chunk)
         current_tokens += line_tokens
@@ -160,8 +177,11 @@ def filter_by_similarity_dynamic(chunks, abs_threshold=-0.67, max_delta=0.12):
     return filtered
 
 
+def preferred_chunk_types(intent):
+    return INTENT_TO_CHUNK_TYPES.get(intent, ["description", "topics"])
+
 def rank_chunks_by_intent(chunks, intent):
-    preferred_types = INTENT_TO_CHUNK_TYPES.get(intent, ["description", "topics"])
+    preferred_types = preferred_chunk_types(intent)
 
     def score(chunk):
         type_score = 0 if chunk.chunk_type in preferred_types else 1
@@ -169,31 +189,74 @@ def rank_chunks_by_intent(chunks, intent):
 
     return sorted(chunks, key=score)
 
-def get_top_chunks(query_embedding, k=20, park_code=None, intent="general"):
+def get_top_chunks(query_embedding, k=20, park_uuid=None, intent="general", ef_search=None, probes=None, exact=False):
+    """
+    Return the `k` chunks closest to `query_embedding` (lowest `<#>` first).
+
+    The lookup goes through the ANN index on TextChunk.embedding. `ef_search`
+    (HNSW) and `probes` (IVFFlat) set the recall/latency trade-off for this
+    query only and default to the VECTOR_SEARCH_* settings.
+
+    With RETRIEVAL_BACKEND = "numpy" the search runs against this worker's
+    memory-mapped export instead (see vector_index.py). `park_uuid` restricts
+    the search to that park's chunks via the indexed TextChunk.park_uuid.
+    `exact=True` skips the ANN index (the ground truth for recall measurements).
+    """
+    if settings.RETRIEVAL_BACKEND == "numpy":
+        return get_top_chunks_from_vector_index(query_embedding, k=k, park_uuid=park_uuid)
+
     query_embedding_str = "[" + ",".join(f"{x:.6f}" for x in query_embedding) + "]"
     queryset = TextChunk.objects.all()
 
-    if park_code:
-        park = Park_Data.objects.filter(park_code=park_code).first()
-        if park:
-            park_uuid_tag = f"park_uuid:{park.uuid}"
-            queryset = queryset.filter(relevance_tags__contains=[park_uuid_tag])
-
-    return (
-        queryset.annotate(
-            similarity=RawSQL("embedding <#> %s", (query_embedding_str,))
+    if park_uuid:
+        queryset = queryset.filter(park_uuid=park_uuid)
+
+    # HNSW can never return more than ef_search rows
+    ef_search = max(ef_search or settings.VECTOR_SEARCH_EF_SEARCH, k)
+    probes = probes or settings.VECTOR_SEARCH_PROBES
+
+    # SET LOCAL only lasts for the enclosing transaction, so the query has to be
+    # evaluated inside it.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL hnsw.ef_search = %s", [int(ef_search)])
+            cursor.execute("SET LOCAL ivfflat.probes = %s", [int(probes)])
+            if park_uuid or exact:
+                # A park only has a few hundred chunks: fetch them through the
+                # park_uuid btree (bitmap scan) and rank them exactly, rather than
+                # walking the global HNSW graph and filtering most results away.
+                cursor.execute("SET LOCAL enable_indexscan = off")
+        return list(
+            queryset.annotate(
+                similarity=RawSQL("embedding <#> %s", (query_embedding_str,))
+            )
+            .order_by("similarity")[:k]
         )
-        .order_by("similarity")[:k]
-    )
 
-def estimate_tokens(text):
+def get_top_chunks_from_vector_index(query_embedding, k=20, park_uuid=None):
+    index = get_vector_index()
+    if index is None:
+        logger.error("RETRIEVAL_BACKEND is 'numpy' but no vector index has been exported")
+        return []
+
+    hits = index.search(query_embedding, k=k, park_uuid=park_uuid)
+    chunks_by_id = TextChunk.objects.defer("embedding").in_bulk([chunk_id for chunk_id, _ in hits])
+
+    chunks = []
+    for chunk_id, similarity in hits:
+        chunk = chunks_by_id.get(chunk_id)
+        if chunk is None:
+            continue  # deleted since the last export
+        chunk.similarity = similarity
+        chunks.append(chunk)
+    return chunks
+
+def build_chat_messages(query, chunks, history, max_tokens=None, history_tokens=None):
     """
-    Rough token estimation: ~4 characters per token for English text.
-    This is a simple heuristic. For more accuracy, use tiktoken library.
+    Build the LLM chat messages. Pass `history_tokens` when `history` is
+    already pruned and counted (server-side conversations); otherwise the
+    history is pruned and counted here.
     """
-    return len(text) // 4
-
-def build_chat_messages(query, chunks, history, max_tokens=None):
     # Calculate output budget
     output_token_budget = 160  # Reserve ~160 tokens for response
     output_token_max = 400
@@ -214,10 +277,12 @@ def build_chat_messages(query, chunks, history, max_tokens=None):
     
     # Calculate tokens used by system prompt and query structure
     question_section = f"Question:\n{query}"
-    history = prune_turns(history, max_turns=3, max_tokens=2000)
-    system_tokens = estimate_tokens(system_prompt)
-    question_tokens = estimate_tokens(question_section)
-    history_tokens = sum(estimate_tokens(m["content"]) + 4 for m in history)
+    if history_tokens is None:
+        history = prune_turns(history, max_turns=3, max_tokens=2000)
+        history_tokens = sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in history)
+    system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD
+    # The user message also carries the "Context:" header and blank-line separator
+    question_tokens = count_tokens(f"Context:\n\n\n{question_section}") + MESSAGE_OVERHEAD
 
     chunks = select_chunks_within_token_budget(
         chunks,
@@ -225,11 +290,7 @@ def build_chat_messages(query, chunks, history, max_tokens=None):
     )
 
     # Build context text
-    context_lines = []
-    for i, chunk in enumerate(chunks, start=1):
-        label = f"{chunk.source_type.upper()} - {chunk.chunk_type or 'general'}"
-        content = chunk.chunk_text.strip().replace("\n", " ")
-        context_lines.append(f"{i}. [{label}]: {content}")
+    context_lines = [f"{i}. {chunk_context_line(chunk)}" for i, chunk in enumerate(chunks, start=1)]
 
     context = "\n".join(context_lines)
     user_prompt = f"Context:\n{context}\n\n{question_section}"
@@ -240,6 +301,134 @@ def build_chat_messages(query, chunks, history, max_tokens=None):
     return messages
 
 
+def get_top_chunks_by_type(query_embedding, chunk_types, k_per_type=5, park_uuid=None):
+    """
+    Return the `k_per_type` closest chunks of each type in `chunk_types`, in a
+    single query: one LATERAL subquery per type, each an exact top-k over that
+    type's rows (found through the chunk_type/park_uuid index).
+
+    Rows come back sorted by similarity, annotated with `similarity` and
+    `type_rank` (position of the chunk's type in `chunk_types`).
+    """
+    if settings.RETRIEVAL_BACKEND == "numpy":
+        return get_top_chunks_by_type_from_vector_index(query_embedding, chunk_types, k_per_type, park_uuid)
+
+    query_embedding_str = "[" + ",".join(f"{x:.6f}" for x in query_embedding) + "]"
+    table = TextChunk._meta.db_table
+    columns = ", ".join(
+        f'c."{field.column}"' for field in TextChunk._meta.concrete_fields if field.name != "embedding"
+    )
+    park_filter = "AND tc.park_uuid = %s" if park_uuid else ""
+
+    sql = f"""
+        WITH hits AS (
+            SELECT {columns}, c.similarity, t.type_rank
+            FROM unnest(%s::varchar[]) WITH ORDINALITY AS t(chunk_type, type_rank)
+            CROSS JOIN LATERAL (
+                SELECT tc.*, tc.embedding <#> %s::vector AS similarity
+                FROM {table} tc
+                WHERE tc.chunk_type = t.chunk_type {park_filter}
+                ORDER BY similarity
+                LIMIT %s
+            ) c
+        )
+        SELECT * FROM hits
+        ORDER BY similarity
+    """
+    params = [list(chunk_types), query_embedding_str] + ([str(park_uuid)] if park_uuid else []) + [k_per_type]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Each per-type top-k is small enough to rank exactly; a filtered HNSW
+            # scan could return fewer than k rows of the requested type.
+            cursor.execute("SET LOCAL enable_indexscan = off")
+        return list(TextChunk.objects.raw(sql, params))
+
+def get_top_chunks_by_type_from_vector_index(query_embedding, chunk_types, k_per_type=5, park_uuid=None):
+    index = get_vector_index()
+    if index is None:
+        logger.error("RETRIEVAL_BACKEND is 'numpy' but no vector index has been exported")
+        return []
+
+    hits_by_type = index.search_by_type(query_embedding, chunk_types, k_per_type=k_per_type, park_uuid=park_uuid)
+    chunks_by_id = TextChunk.objects.defer("embedding").in_bulk(
+        [chunk_id for hits in hits_by_type.values() for chunk_id, _ in hits]
+    )
+
+    chunks = []
+    for type_rank, chunk_type in enumerate(chunk_types, start=1):
+        for chunk_id, similarity in hits_by_type.get(chunk_type, []):
+            chunk = chunks_by_id.get(chunk_id)
+            if chunk is None:
+                continue  # deleted since the last export
+            chunk.similarity = similarity
+            chunk.type_rank = type_rank
+            chunks.append(chunk)
+
+    chunks.sort(key=lambda c: c.similarity)
+    return chunks
+
+def merge_ranked_chunks(chunks, abs_threshold=-0.67, max_delta=0.12, max_per_source=2, max_per_type=2, k=5):
+    """
+    Post-processing for get_top_chunks_by_type rows. Keeps the chunks that pass
+    the same relevance filter as the global path, then orders them by
+    preferred type (`type_rank`) and similarity. Each type gets at most
+    `max_per_type` chunks until every type has had its turn; leftover room
+    goes to the remaining chunks in the same order.
+    """
+    ranked = sorted(
+        filter_by_similarity_dynamic(chunks, abs_threshold=abs_threshold, max_delta=max_delta),
+        key=lambda chunk: (chunk.type_rank, chunk.similarity),
+    )
+
+    merged = []
+    per_source = defaultdict(int)
+    per_type = defaultdict(int)
+    for within_quota in (True, False):
+        for chunk in ranked:
+            if len(merged) >= k:
+                return merged
+            if chunk in merged or per_source[chunk.source_uuid] >= max_per_source:
+                continue
+            if within_quota and per_type[chunk.type_rank] >= max_per_type:
+                continue
+            merged.append(chunk)
+            per_source[chunk.source_uuid] += 1
+            per_type[chunk.type_rank] += 1
+    return merged
+
+def retrieve_chunks(query_embedding, intent, park_uuid=None, mode=None, timer=None):
+    """
+    Return (raw_chunks, chunks): the retrieval candidates and the chunks used as LLM context.
+
+    "global" (default) takes the overall top 20 and filters, ranks and limits
+    them in Python. "per_type" fetches the top 5 of each chunk type preferred
+    for `intent`, so e.g. a fees question always sees the best fee chunks.
+    `timer` receives the "vector_search" and "rerank" stages.
+    """
+    mode = mode or settings.RETRIEVAL_MODE
+    timer = timer or StageTimer()
+
+    if mode == "per_type":
+        with timer.stage("vector_search"):
+            raw_chunks = get_top_chunks_by_type(query_embedding, preferred_chunk_types(intent), k_per_type=5, park_uuid=park_uuid)
+        with timer.stage("rerank"):
+            chunks = merge_ranked_chunks(raw_chunks, abs_threshold=-0.67, max_delta=0.12, max_per_source=2, k=5)
+        return raw_chunks, chunks
+
+    with timer.stage("vector_search"):
+        raw_chunks = get_top_chunks(query_embedding, k=20, park_uuid=park_uuid)
+
+    with timer.stage("rerank"):
+        filtered_chunks = filter_by_similarity_dynamic(
+            raw_chunks,
+            abs_threshold=-0.67,  # TIGHTER floor you requested
+            max_delta=0.12        # only keep chunks near the top match
+        )
+        ranked_chunks = rank_chunks_by_intent(filtered_chunks, intent)
+        chunks = limit_chunks_per_source(ranked_chunks, max_per_source=2, k=5)
+    return raw_chunks, chunks
+
 def limit_chunks_per_source(chunks, max_per_source=2, k=10):
     limited = []
     seen = defaultdict(int)
@@ -270,165 +459,554 @@ def infer_intent_from_query(query):
     else:
         return "general"
 
-@api_view(['POST'])
-def ask_question(request):
-    user_question = request.data.get("question", "").strip()[:MAX_QUESTION_LENGTH]
-    history = request.data.get("history", [])
-    history = history if isinstance(history, list) else []
-
-    if not user_question:
-        return Response({"error": "Missing 'question' in request."}, status=400)
-
-    debug = request.data.get("debug", False)
+def json_line(obj):
+    return json.dumps(obj) + "\n"
+
+def history_event(history, user_question, assistant_response):
+    updated_history = history + [
+        {"role": "user", "content": user_question},
+        {"role": "assistant", "content": assistant_response}
+    ]
+    return json_line({
+        "event": "history",
+        "updated_history": updated_history
+    })
 
+def chat_history_event(ctx, assistant_response):
+    """The final `history` event: just the conversation id when history is kept server-side."""
+    if ctx.conversation is not None:
+        return json_line({"event": "history", "conversation_id": ctx.conversation.id})
+    return history_event(ctx.history, ctx.question, assistant_response)
+
+def remember_turn(ctx, assistant_response):
+    if ctx.conversation is not None:
+        ctx.conversation.append_turn(ctx.question, assistant_response)
+        ctx.conversation.save()
+
+def replay_cached_answer(ctx):
+    """Stream a cached answer with the same NDJSON events as a live LLM answer."""
+    yield json_line({"event": "ready", "cached": True})
+    for text in iter_answer_tokens(ctx.cached_answer):
+        yield json_line({"event": "token", "text": text})
+    yield chat_history_event(ctx, ctx.cached_answer)
+
+def chat_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/plain")
+    response["Cache-Control"] = "no-cache"
+    response["Access-Control-Allow-Origin"] = "https://npe.marshallcodes.com"
+    response["Access-Control-Allow-Credentials"] = "true"
+    return response
+
+class ChatContext:
+    """Everything step 1 of /api/ask produces; shared by the sync and async views."""
+
+    def __init__(self, question, history, debug=False, timer=None):
+        self.question = question
+        self.history = history
+        self.debug = debug
+        self.timer = timer or StageTimer()
+        self.query_embedding = None
+        self.intent = None
+        self.park_code = None
+        self.park_uuid = None
+        self.use_answer_cache = False
+        self.cached_answer = None
+        self.raw_chunks = []
+        self.chunks = []
+        self.chat_messages = []
+        self.client_id = None
+        self.conversation = None
+        self.warmed = False
+
+
+def parse_chat_request(data):
+    user_question = str(data.get("question", "") or "").strip()[:MAX_QUESTION_LENGTH]
+    history = data.get("history", [])
+    history = history if isinstance(history, list) else []
+    debug = data.get("debug", False)
+    # None: the client keeps the history; "" or null: start a server-side conversation
+    conversation_id = data.get("conversation_id", "") if "conversation_id" in data else None
+    return user_question, history, debug, conversation_id
+
+def chat_client_id(request):
+    """Who a chat counts against for admission fairness: the signed-in user, else the client IP."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    # Behind the proxy (see SECURE_PROXY_SSL_HEADER) the client is the address the
+    # proxy appended as the last X-Forwarded-For hop; earlier hops are whatever
+    # the client sent and can't be trusted.
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    ip = forwarded.split(",")[-1].strip() or request.META.get("REMOTE_ADDR", "")
+    return f"ip:{ip}"
+
+def prepare_chat(user_question, history, debug=False, timer=None, conversation_id=None):
+    """
+    Embed the question, infer intent and park, then either find a cached answer
+    or retrieve chunks and build the LLM chat messages. With a
+    `conversation_id` the stored turns replace the client's `history`.
+    """
+    ctx = ChatContext(user_question, history, debug, timer)
+    timer = ctx.timer
+    if conversation_id is not None:
+        with timer.stage("conversation"):
+            ctx.conversation = load_conversation(conversation_id)
+        if ctx.conversation is not None:
+            ctx.history = history = ctx.conversation.messages()
+
+    # --- Step 1: Embed question, infer intent, and retrieve chunks ---
+    with timer.stage("embed"):
+        ctx.query_embedding = embed_query(user_question).tolist()
+    ctx.intent = infer_intent_from_query(user_question)
+    with timer.stage("park_match"):
+        park = get_park_from_question(user_question)
+    ctx.park_code = park.park_code if park else None
+    ctx.park_uuid = park.uuid if park else None
+
+    # Answers only depend on the question when there is no prior conversation
+    ctx.use_answer_cache = not history and not debug
+    if ctx.use_answer_cache:
+        with timer.stage("answer_cache"):
+            ctx.cached_answer = lookup_answer(ctx.query_embedding, ctx.park_uuid, ctx.intent)
+        if ctx.cached_answer is not None:
+            remember_turn(ctx, ctx.cached_answer)
+            return ctx
+
+    ctx.raw_chunks, ctx.chunks = retrieve_chunks(ctx.query_embedding, ctx.intent, park_uuid=ctx.park_uuid, timer=timer)
+    history_tokens = ctx.conversation.tokens if ctx.conversation is not None else None
+    with timer.stage("build_prompt"):
+        ctx.chat_messages = build_chat_messages(user_question, ctx.chunks, history, history_tokens=history_tokens)
+    return ctx
+
+def chat_debug_payload(ctx):
+    return {
+        "question": ctx.question,
+        "intent": ctx.intent,
+        "matched_park_code": ctx.park_code,
+        "raw_chunks": [
+            {
+                "chunk_index": chunk.chunk_index,
+                "chunk_type": chunk.chunk_type,
+                "source_uuid": str(chunk.source_uuid),
+                "similarity": getattr(chunk, "similarity", None),
+                "text_preview": chunk.chunk_text[:200] + ("..." if len(chunk.chunk_text) > 200 else "")
+            } for chunk in ctx.raw_chunks
+        ],
+        "retrieved_chunks": [
+            {
+                "chunk_index": chunk.chunk_index,
+                "source_type": chunk.source_type,
+                "chunk_type": chunk.chunk_type,
+                "source_uuid": str(chunk.source_uuid),
+                "chunk_text": chunk.chunk_text[:1000] + ("..." if len(chunk.chunk_text) > 1000 else ""),
+                "similarity": getattr(chunk, "similarity", None)
+            } for chunk in ctx.chunks
+        ],
+        "chat_messages": ctx.chat_messages,
+        "embedding_cache": query_embedding_cache.stats(),
+        "timings": ctx.timer.as_dict(),
+    }
+
+def log_chat_timings(ctx, outcome):
+    logger.info(ctx.timer.log_line(
+        outcome=outcome,
+        intent=ctx.intent,
+        park_code=ctx.park_code,
+        cached=ctx.cached_answer is not None,
+        warmed=ctx.warmed,
+    ))
+
+def with_server_timing(response, timer):
+    response["Server-Timing"] = timer.server_timing_header()
+    return response
+
+def timed_events(ctx, events):
+    """Pass `events` through, then send the `timings` event and log the request's timings."""
+    outcome = "disconnected"
     try:
-        # --- Step 1: Embed question, infer intent, and retrieve chunks ---
-        query_embedding = embedding_model.encode(user_question).tolist()
-        intent = infer_intent_from_query(user_question)
-        park_code = get_park_code_from_question(user_question)
-
-        raw_chunks = get_top_chunks(query_embedding, k=20, park_code=park_code)
+        yield from events
+        outcome = "completed"
+        yield json_line({"event": "timings", "timings": ctx.timer.as_dict()})
+    finally:
+        log_chat_timings(ctx, outcome)
+
+async def atimed_events(ctx, events):
+    outcome = "disconnected"
+    try:
+        async for event in events:
+            yield event
+        outcome = "completed"
+        yield json_line({"event": "timings", "timings": ctx.timer.as_dict()})
+    finally:
+        log_chat_timings(ctx, outcome)
+
+def finish_chat(ctx, assistant_response, completed=True):
+    """
+    Cache the answer if eligible, store the turn, and return the final
+    `history` event. An answer from a stream that failed (`completed` False)
+    is never cached.
+    """
+    if ctx.use_answer_cache and completed:
+        store_answer(ctx.query_embedding, ctx.park_uuid, ctx.intent, ctx.question, assistant_response)
+    remember_turn(ctx, assistant_response)
+    return chat_history_event(ctx, assistant_response)
+
+def record_probe_timings(timer, state):
+    """Add how long the Lambda call and health check took in the probe this chat acted on."""
+    for name in ("lambda_probe", "health_check"):
+        if state and state.get(f"{name}_ms") is not None:
+            timer.record(name, state[f"{name}_ms"])
+
+def instant_answer_event(ctx):
+    """
+    The extractive `instant_answer` event. Sent by the readiness wait the
+    first time a probe reports a cold start, so a chat that finds the LLM
+    ready never gets one.
+    """
+    if not settings.INSTANT_ANSWER_ENABLED:
+        return None
+    try:
+        with ctx.timer.stage("instant_answer"):
+            return build_instant_answer(ctx.query_embedding, ctx.chunks)
+    except Exception:
+        # Best effort: the generative answer still follows
+        logger.exception("Instant answer failed")
+        return None
+
+# --- Step 2: Wait for the shared LLM readiness state, take an LLM slot, then relay the LLM's tokens ---
+def llm_event_stream(ctx):
+    if not os.getenv("LAMBDA_LLM_START_URL"):
+        logger.error("LAMBDA_LLM_START_URL not configured")
+        yield json_line({"event": "error", "type": "misconfigured"})
+        return
+
+    # Readiness first: during a cold start no chat can be served, so none should hold a slot
+    wait = LLMReadinessWait()
+    yield from llm_readiness_events(ctx, wait)
+    if not wait.llm_ip:
+        return
+
+    admission = AdmissionWait(ctx.client_id)
+    with ctx.timer.stage("queue"):
+        while True:
+            for event in admission.step():
+                yield json_line(event)
+            if admission.done:
+                break
+            time.sleep(admission.interval)
+    if not admission.admitted:
+        return
 
-        filtered_chunks = filter_by_similarity_dynamic(
-            raw_chunks,
-            abs_threshold=-0.67,  # TIGHTER floor you requested
-            max_delta=0.12        # only keep chunks near the top match
+    try:
+        yield from relay_llm_answer(ctx, admission, wait.llm_ip)
+    finally:
+        admission.release()
+
+def llm_readiness_events(ctx, wait):
+    """Poll the shared state until `wait` is done, sending the instant answer if a cold start is seen."""
+    instant_answer_sent = False
+    with ctx.timer.stage("llm_wait"):
+        while True:
+            state = read_llm_state()
+            for event in wait.observe(state):
+                yield json_line(event)
+            if wait.cold_start and not instant_answer_sent:
+                instant_answer_sent = True
+                instant_answer = instant_answer_event(ctx)
+                if instant_answer:
+                    yield json_line(instant_answer)
+            if wait.done:
+                break
+            time.sleep(wait.interval)
+    record_probe_timings(ctx.timer, state)
+
+def relay_llm_answer(ctx, admission, llm_ip):
+    headers = llm_auth_headers()
+    llm_url = f"http://{llm_ip}:5000/infer"
+    infer_started = time.perf_counter()
+    # A busy server can take a while to send headers; keep the slot meanwhile
+    with admission.kept_alive():
+        llm_response = http_client.post(
+            llm_url,
+            headers=headers,
+            json={"messages": ctx.chat_messages},
+            stream=True,
+            timeout=300
         )
-        ranked_chunks = rank_chunks_by_intent(filtered_chunks, intent)
-        chunks = limit_chunks_per_source(ranked_chunks, max_per_source=2, k=5)
-        chat_messages = build_chat_messages(user_question, chunks, history)
-
-        # --- Optional debug info ---
-        if debug:
-            return Response({
-                "question": user_question,
-                "intent": intent,
-                "matched_park_code": park_code,
-                "raw_chunks": [
-                    {
-                        "chunk_index": chunk.chunk_index,
-                        "chunk_type": chunk.chunk_type,
-                        "source_uuid": str(chunk.source_uuid),
-                        "similarity": getattr(chunk, "similarity", None),
-                        "text_preview": chunk.chunk_text[:200] + ("..." if len(chunk.chunk_text) > 200 else "")
-                    } for chunk in raw_chunks
-                ],
-                "retrieved_chunks": [
-                    {
-                        "chunk_index": chunk.chunk_index,
-                        "source_type": chunk.source_type,
-                        "chunk_type": chunk.chunk_type,
-                        "source_uuid": str(chunk.source_uuid),
-                        "chunk_text": chunk.chunk_text[:1000] + ("..." if len(chunk.chunk_text) > 1000 else ""),
-                        "similarity": getattr(chunk, "similarity", None)
-                    } for chunk in chunks
-                ],
-                "chat_messages": chat_messages
-            })
-
-        # --- Step 2: Query Lambda for LLM server status ---
-        def json_line(obj):
-            return json.dumps(obj) + "\n"
-    
-        def stream():
-            LAMBDA_URL = os.getenv("LAMBDA_LLM_START_URL")
-            if not LAMBDA_URL:
-                logger.error("LAMBDA_LLM_START_URL not configured")
-                yield json_line({"event": "error", "type": "misconfigured"})
-                return
-            
-            headers = {"Authorization": f"Bearer {settings.LLM_LAMBDA_SECRET}"}
-
-            llm_ip = None
-            poll_intervals = [5, 7, 10, 15, 15, 15]
-
-            for attempt, interval in enumerate(poll_intervals, start=1):
-                try:
-                    lambda_response = requests.get(LAMBDA_URL, headers=headers, timeout=10)
-                    data = lambda_response.json()
-                    logger.info(f"Lambda poll attempt {attempt}: {data}")
-                except Exception as e:
-                    yield json_line({"event": "error", "type": "lambda_error", "message": str(e)})
-                    time.sleep(interval)
-                    continue
-
-                status = data.get("status")
-
-                # LLM server has hit monthly limit
-                if status == "disabled":
-                    yield json_line({"event": "error", "type": "usage_limit"})
-                    return
-
-                # LLM server is ready
-                if status == "ready":
-                    llm_ip = data.get("llm_ip")
-                    yield json_line({"event": "ready"})
-                    break
-
-                # LLM server is starting
-                if status == "starting":
-                    yield json_line({"event": "starting", "attempt": attempt})
-
-                time.sleep(interval)
-
-            if not llm_ip:
-                yield json_line({"event": "error", "type": "llm_server_not_ready"})
-                return
-            
-            # --- Health check to make sure LLM server is good to go ---
-            health_url = f"http://{llm_ip}:5000/health"
-            try:
-                health_resp = requests.get(health_url, headers=headers, timeout=30)
-                health_data = health_resp.json()
-                if health_data.get("status") != "ok":
-                    logger.warning("LLM health endpoint did not return ok")
-                    yield json_line({"event": "error", "type": "health_check_failed"})
-                    return
-            except requests.RequestException as e:
-                logger.warning(f"LLM health check failed: {e}")
-                yield json_line({"event": "error", "type": "health_check_failed"})
-                return
-
-            # --- Now stream LLM tokens ---
-            llm_url = f"http://{llm_ip}:5000/infer"
-            llm_response = requests.post(
-                llm_url,
-                headers=headers,
-                json={"messages": chat_messages},
-                stream=True,
-                timeout=300
-            )
-
-            assistant_response = ""
 
+    # Closing returns the pooled connection even if the client disconnects mid-stream
+    with llm_response:
+        if not llm_response.ok:
+            # Don't relay an error page to the browser as answer tokens
+            logger.error(f"LLM /infer returned HTTP {llm_response.status_code}")
+            yield json_line({"event": "error", "type": "llm_error", "status": llm_response.status_code})
+            return
+
+        assistant_response = ""
+        errored = False
+
+        if settings.LLM_RELAY_MODE == "raw":
+            scanner = TokenTextScanner()
+            for data in llm_response.iter_content(chunk_size=None):
+                admission.keepalive()
+                lines = scanner.feed(data)
+                if lines:
+                    if scanner.tokens and "llm_first_token" not in ctx.timer.stages:
+                        ctx.timer.record("llm_first_token", ctx.timer.since(infer_started))
+                    yield lines
+            tail = scanner.flush()
+            if tail:
+                yield tail
+            assistant_response = scanner.text
+            errored = scanner.errored
+        else:
             for line in llm_response.iter_lines(decode_unicode=True):
+                admission.keepalive()
                 if line:
                     # extract the text token (depends on your LLM server format)
                     payload = json.loads(line)
                     if payload.get("event") == "token":
+                        if "llm_first_token" not in ctx.timer.stages:
+                            ctx.timer.record("llm_first_token", ctx.timer.since(infer_started))
                         text = payload.get("text", "")
                         assistant_response += text
+                    elif payload.get("event") == "error":
+                        errored = True
                     yield line + "\n"
+    ctx.timer.record("llm_stream", ctx.timer.since(infer_started))
+
+    yield finish_chat(ctx, assistant_response, completed=not errored)
+
+async def allm_event_stream(ctx):
+    """
+    Async twin of llm_event_stream for the ASGI view: the same events, but
+    waiting on asyncio.sleep and httpx so a worker can hold many chats at once.
+    """
+    if not os.getenv("LAMBDA_LLM_START_URL"):
+        logger.error("LAMBDA_LLM_START_URL not configured")
+        yield json_line({"event": "error", "type": "misconfigured"})
+        return
+
+    wait = LLMReadinessWait()
+    async for event in allm_readiness_events(ctx, wait):
+        yield event
+    if not wait.llm_ip:
+        return
+
+    admission = AdmissionWait(ctx.client_id)
+    with ctx.timer.stage("queue"):
+        while True:
+            for event in await sync_to_async(admission.step, thread_sensitive=False)():
+                yield json_line(event)
+            if admission.done:
+                break
+            await asyncio.sleep(admission.interval)
+    if not admission.admitted:
+        return
+
+    try:
+        async for event in arelay_llm_answer(ctx, admission, wait.llm_ip):
+            yield event
+    finally:
+        await sync_to_async(admission.release, thread_sensitive=False)()
+
+async def allm_readiness_events(ctx, wait):
+    instant_answer_sent = False
+    with ctx.timer.stage("llm_wait"):
+        while True:
+            state = await sync_to_async(read_llm_state, thread_sensitive=False)()
+            for event in wait.observe(state):
+                yield json_line(event)
+            if wait.cold_start and not instant_answer_sent:
+                instant_answer_sent = True
+                instant_answer = await sync_to_async(instant_answer_event, thread_sensitive=False)(ctx)
+                if instant_answer:
+                    yield json_line(instant_answer)
+            if wait.done:
+                break
+            await asyncio.sleep(wait.interval)
+    record_probe_timings(ctx.timer, state)
+
+async def arelay_llm_answer(ctx, admission, llm_ip):
+    headers = llm_auth_headers()
+    client = http_client.get_async_client()
+    llm_url = f"http://{llm_ip}:5000/infer"
+    assistant_response = ""
+    infer_started = time.perf_counter()
+    # A busy server can take a while to send headers; keep the slot meanwhile
+    keepalive_task = asyncio.create_task(akeep_slot_alive(admission))
+    try:
+        async with client.stream(
+            "POST",
+            llm_url,
+            headers=headers,
+            json={"messages": ctx.chat_messages},
+            timeout=httpx.Timeout(300, connect=10),
+        ) as llm_response:
+            keepalive_task.cancel()
+            if not llm_response.is_success:
+                logger.error(f"LLM /infer returned HTTP {llm_response.status_code}")
+                yield json_line({"event": "error", "type": "llm_error", "status": llm_response.status_code})
+                return
+            errored = False
+            if settings.LLM_RELAY_MODE == "raw":
+                scanner = TokenTextScanner()
+                async for data in llm_response.aiter_bytes():
+                    await akeepalive(admission)
+                    lines = scanner.feed(data)
+                    if lines:
+                        if scanner.tokens and "llm_first_token" not in ctx.timer.stages:
+                            ctx.timer.record("llm_first_token", ctx.timer.since(infer_started))
+                        yield lines
+                tail = scanner.flush()
+                if tail:
+                    yield tail
+                assistant_response = scanner.text
+                errored = scanner.errored
+            else:
+                async for line in llm_response.aiter_lines():
+                    await akeepalive(admission)
+                    if line:
+                        payload = json.loads(line)
+                        if payload.get("event") == "token":
+                            if "llm_first_token" not in ctx.timer.stages:
+                                ctx.timer.record("llm_first_token", ctx.timer.since(infer_started))
+                            assistant_response += payload.get("text", "")
+                        elif payload.get("event") == "error":
+                            errored = True
+                        yield line + "\n"
+    finally:
+        keepalive_task.cancel()
+    ctx.timer.record("llm_stream", ctx.timer.since(infer_started))
+
+    # Touches the ORM, so it runs on the thread Django manages connections for
+    yield await sync_to_async(finish_chat)(ctx, assistant_response, not errored)
+
+async def akeepalive(admission):
+    # Only hop to a thread on the rare polls where the slot actually needs refreshing
+    if admission.keepalive_due:
+        await sync_to_async(admission.keepalive, thread_sensitive=False)()
+
+async def akeep_slot_alive(admission):
+    """Async counterpart of AdmissionWait.kept_alive(): refresh the slot until cancelled."""
+    while True:
+        await asyncio.sleep(SLOT_KEEPALIVE_INTERVAL)
+        await akeepalive(admission)
+
+async def aiter_events(events):
+    for event in events:
+        yield event
+
+@api_view(['POST'])
+def ask_question(request):
+    user_question, history, debug, conversation_id = parse_chat_request(request.data)
 
-            updated_history = history + [
-                {"role": "user", "content": user_question},
-                {"role": "assistant", "content": assistant_response}
-            ]
+    if not user_question:
+        return Response({"error": "Missing 'question' in request."}, status=400)
 
-            yield json.dumps({
-                "event": "history",
-                "updated_history": updated_history
-            }) + "\n"
+    timer = StageTimer()
+    try:
+        ctx = prepare_chat(user_question, history, debug, timer, conversation_id)
 
-        response = StreamingHttpResponse(stream(), content_type="text/plain")
-        response["Cache-Control"] = "no-cache"
-        response["Access-Control-Allow-Origin"] = "https://npe.marshallcodes.com"
-        response["Access-Control-Allow-Credentials"] = "true"
-        return response
+        if ctx.cached_answer is not None:
+            return chat_stream_response(timed_events(ctx, replay_cached_answer(ctx)))
+
+        # --- Optional debug info ---
+        if debug:
+            log_chat_timings(ctx, "debug")
+            return with_server_timing(Response(chat_debug_payload(ctx)), timer)
+
+        ctx.client_id = chat_client_id(request)
+        ctx.warmed = was_warmed(ctx.client_id)
+        return chat_stream_response(timed_events(ctx, llm_event_stream(ctx)))
 
     except Exception as e:
         logger.exception("Error in ask_question")
-        return Response({"error": str(e)}, status=500)
+        logger.info(timer.log_line(outcome="error"))
+        return with_server_timing(Response({"error": str(e)}, status=500), timer)
+
+def authenticate_chat_request(request):
+    """
+    Set `request.user` the way @api_view views do, with REST_FRAMEWORK's
+    DEFAULT_AUTHENTICATION_CLASSES. Raises AuthenticationFailed for a bad
+    token, which those views answer with a 401.
+    """
+    request.user = AnonymousUser()
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authenticator_class().authenticate(request)
+        if result is not None:
+            request.user = result[0]
+            return
+
+async def ask_question_async(request):
+    """
+    ASGI version of ask_question. Retrieval runs in a worker thread; the Lambda
+    polling and LLM relay are awaited, so long chats don't pin a worker.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    # Looks the user up in the database, so it runs on Django's sync thread
+    try:
+        await sync_to_async(authenticate_chat_request)(request)
+    except AuthenticationFailed as e:
+        # Same body as DRF's exception handler
+        return JsonResponse(e.detail if isinstance(e.detail, dict) else {"detail": e.detail}, status=e.status_code)
+
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+    user_question, history, debug, conversation_id = parse_chat_request(data if isinstance(data, dict) else {})
+
+    if not user_question:
+        return JsonResponse({"error": "Missing 'question' in request."}, status=400)
+
+    timer = StageTimer()
+    try:
+        ctx = await sync_to_async(prepare_chat)(user_question, history, debug, timer, conversation_id)
+
+        if ctx.cached_answer is not None:
+            return chat_stream_response(atimed_events(ctx, aiter_events(replay_cached_answer(ctx))))
+
+        if debug:
+            log_chat_timings(ctx, "debug")
+            return with_server_timing(JsonResponse(chat_debug_payload(ctx)), timer)
+
+        ctx.client_id = chat_client_id(request)
+        ctx.warmed = await sync_to_async(was_warmed, thread_sensitive=False)(ctx.client_id)
+        return chat_stream_response(atimed_events(ctx, allm_event_stream(ctx)))
+
+    except Exception as e:
+        logger.exception("Error in ask_question_async")
+        logger.info(timer.log_line(outcome="error"))
+        return with_server_timing(JsonResponse({"error": str(e)}, status=500), timer)
+
+# Like @api_view views, the chat endpoint authenticates with a bearer token, not
+# a session cookie. csrf_exempt() can't wrap a coroutine under Django 4.2.
+ask_question_async.csrf_exempt = True
+
+@api_view(['POST'])
+def warm_llm_server(request):
+    """
+    Start the LLM instance ahead of the first question (e.g. when the chat
+    panel opens). Returns at once with the current shared readiness state;
+    the startup itself runs in the background prober. Rate limited per
+    chat_client_id: the signed-in user, else the address the proxy saw, so a
+    client can't dodge the limit by sending its own X-Forwarded-For.
+    """
+    if not os.getenv("LAMBDA_LLM_START_URL"):
+        return Response({"error": "LLM is not configured."}, status=503)
+
+    try:
+        state = warm_llm(chat_client_id(request))
+    except WarmRateLimited:
+        return Response({"error": "Already warming."}, status=429, headers={"Retry-After": str(settings.LLM_WARM_MIN_INTERVAL)})
+
+    return Response({
+        "status": state["status"] if state else "warming",
+        "healthy": state["healthy"] if state else None,
+    }, status=202)
 
 @api_view(['GET'])
 def github_chart_data(request):
@@ -468,7 +1046,7 @@ def github_chart_data(request):
             "Authorization": f"Bearer {settings.GITHUB_TOKEN}",
             "Content-Type": "application/json"
         }
-        response = requests.post(
+        response = http_client.post(
             'https://api.github.com/graphql', 
             json={'query': query}, 
             headers=headers,
@@ -504,7 +1082,7 @@ def github_chart_data(request):
 def getWeather(request):
     lng = request.query_params.get('lng')
     lat = request.query_params.get('lat')
-    weather = requests.get(f'https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lng}&exclude=&appid={settings.OPEN_WEATHER_API_KEY}').json()
+    weather = http_client.get(f'https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lng}&exclude=&appid={settings.OPEN_WEATHER_API_KEY}').json()
     return Response(weather)
 
 
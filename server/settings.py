@@ -117,6 +117,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'server.wsgi.application'
 
+# Serve /api/ask with the async view. Only enable when running under ASGI
+# (GUNICORN_ASGI=true in gunicorn_config.py); WSGI would buffer the whole stream.
+ASYNC_CHAT = os.environ.get("ASYNC_CHAT", "false").lower() == "true"
+
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
@@ -137,6 +141,106 @@ DATABASES = {
 }
 
 
+# Vector search (pgvector)
+# Per-query recall knobs for the TextChunk.embedding ANN index. Higher values
+# trade latency for recall; get_top_chunks() can override them per call.
+VECTOR_SEARCH_EF_SEARCH = int(os.environ.get("VECTOR_SEARCH_EF_SEARCH", 40))  # HNSW
+VECTOR_SEARCH_PROBES = int(os.environ.get("VECTOR_SEARCH_PROBES", 10))  # IVFFlat
+
+# Where get_top_chunks() searches: "pgvector" (SQL) or "numpy" (memory-mapped
+# export written by `manage.py export_vector_index`, also works on SQLite)
+RETRIEVAL_BACKEND = os.environ.get("RETRIEVAL_BACKEND", "pgvector")
+VECTOR_INDEX_DIR = os.environ.get("VECTOR_INDEX_DIR", os.path.join(BASE_DIR, "vector_index"))
+# "global" (top 20 overall, then filtered in Python) or "per_type" (top 5 of each
+# chunk type preferred for the question's intent, in one query)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "global")
+# Embeddings
+EMBEDDING_MODEL_NAME = os.environ.get("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_MODEL_CACHE_FOLDER = os.environ.get("EMBEDDING_MODEL_CACHE_FOLDER", "/tmp/huggingface")
+# "torch" (sentence-transformers) or "onnx" (ONNX Runtime, see `manage.py export_onnx_encoder`)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+ONNX_ENCODER_DIR = os.environ.get("ONNX_ENCODER_DIR", os.path.join(BASE_DIR, "onnx_encoder"))
+ONNX_ENCODER_QUANTIZED = os.environ.get("ONNX_ENCODER_QUANTIZED", "true").lower() == "true"
+ONNX_ENCODER_THREADS = int(os.environ.get("ONNX_ENCODER_THREADS", 0)) or None
+# Optional shared embedding service (`manage.py run_embedding_service`). When the
+# socket is set, workers and run_embedding_task encode through it instead of
+# loading their own model.
+EMBEDDING_SERVICE_SOCKET = os.environ.get("EMBEDDING_SERVICE_SOCKET", "")
+EMBEDDING_SERVICE_TIMEOUT = float(os.environ.get("EMBEDDING_SERVICE_TIMEOUT", 10))
+EMBEDDING_SERVICE_FALLBACK = os.environ.get("EMBEDDING_SERVICE_FALLBACK", "true").lower() == "true"
+EMBEDDING_SERVICE_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_SERVICE_BATCH_WINDOW_MS", 5))
+EMBEDDING_SERVICE_MAX_BATCH = int(os.environ.get("EMBEDDING_SERVICE_MAX_BATCH", 64))
+# Query embedding cache: per-worker LRU, plus an optional tier in the shared Django cache
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+QUERY_EMBEDDING_SHARED_CACHE = os.environ.get("QUERY_EMBEDDING_SHARED_CACHE", "false").lower() == "true"
+QUERY_EMBEDDING_SHARED_CACHE_TIMEOUT = int(os.environ.get("QUERY_EMBEDDING_SHARED_CACHE_TIMEOUT", 60 * 60 * 24 * 7))
+# Progress of an interrupted run_embedding_task, resumed by the next run
+EMBEDDING_CHECKPOINT_FILE = os.environ.get("EMBEDDING_CHECKPOINT_FILE", os.path.join(BASE_DIR, "embedding_checkpoint.json"))
+
+# Semantic answer cache for /api/ask (first-turn questions only). Off by default
+# with the per-process LocMemCache, where run_embedding_task's version bumps never
+# reach the web workers and stale answers would be served.
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true" if os.environ.get("CACHE_BACKEND") else "false").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get("ANSWER_CACHE_SIMILARITY_THRESHOLD", 0.95))
+ANSWER_CACHE_TTL = int(os.environ.get("ANSWER_CACHE_TTL", 60 * 60 * 6))
+ANSWER_CACHE_MAX_PER_BUCKET = int(os.environ.get("ANSWER_CACHE_MAX_PER_BUCKET", 50))
+
+# Server-side chat history for /api/ask requests that send a conversation_id.
+# Only used with a shared CACHES backend; otherwise clients keep the history.
+CONVERSATION_TTL = int(os.environ.get("CONVERSATION_TTL", 60 * 60 * 6))  # idle conversations are forgotten after this
+CONVERSATION_MAX_TURNS = int(os.environ.get("CONVERSATION_MAX_TURNS", 3))  # user+assistant pairs kept
+CONVERSATION_MAX_TOKENS = int(os.environ.get("CONVERSATION_MAX_TOKENS", 2000))  # history budget in the prompt
+
+# Extractive answer sent while the LLM isn't ready yet (see national_park_explorer/instant_answer.py)
+INSTANT_ANSWER_ENABLED = os.environ.get("INSTANT_ANSWER_ENABLED", "true").lower() == "true"
+INSTANT_ANSWER_MAX_CHUNKS = int(os.environ.get("INSTANT_ANSWER_MAX_CHUNKS", 3))  # best-ranked chunks searched
+INSTANT_ANSWER_MAX_SENTENCES = int(os.environ.get("INSTANT_ANSWER_MAX_SENTENCES", 3))
+INSTANT_ANSWER_MIN_SIMILARITY = float(os.environ.get("INSTANT_ANSWER_MIN_SIMILARITY", 0.35))  # cosine, query vs sentence
+
+# Tokenizer of the chat LLM, used to budget the prompt: a tokenizer.json path or a
+# Hugging Face repo id. Unset falls back to a ~4 chars/token estimate.
+LLM_TOKENIZER_NAME = os.environ.get("LLM_TOKENIZER_NAME", "")
+# How /infer tokens are relayed: "raw" forwards the response bytes and scans out
+# the token text (see llm_relay.py); "lines" json-decodes every line.
+LLM_RELAY_MODE = os.environ.get("LLM_RELAY_MODE", "raw")
+
+# Shared LLM readiness state (see national_park_explorer/llm_status.py)
+LLM_STATUS_POLL_INTERVAL = float(os.environ.get("LLM_STATUS_POLL_INTERVAL", 5))  # between Lambda/health probes
+LLM_STATUS_TTL = int(os.environ.get("LLM_STATUS_TTL", 15))  # how long a probe result counts as fresh
+LLM_STATUS_ACTIVE_WINDOW = int(os.environ.get("LLM_STATUS_ACTIVE_WINDOW", 60))  # keep probing this long after a chat
+LLM_STATUS_WAIT_INTERVAL = float(os.environ.get("LLM_STATUS_WAIT_INTERVAL", 1))  # how often chats re-read the state
+LLM_READY_TIMEOUT = int(os.environ.get("LLM_READY_TIMEOUT", 70))  # give up with llm_server_not_ready
+LLM_WARM_MIN_INTERVAL = int(os.environ.get("LLM_WARM_MIN_INTERVAL", 30))  # per user/IP between /api/ask/warm calls
+LLM_WARM_ACTIVE_WINDOW = int(os.environ.get("LLM_WARM_ACTIVE_WINDOW", 180))  # keep probing this long after a warm-up
+
+# Admission control in front of /infer (see national_park_explorer/admission.py).
+# Needs a shared CACHES backend: with LocMemCache each worker has its own limits.
+LLM_ADMISSION_ENABLED = os.environ.get("LLM_ADMISSION_ENABLED", "true").lower() == "true"
+LLM_MAX_CONCURRENT_STREAMS = int(os.environ.get("LLM_MAX_CONCURRENT_STREAMS", 2))  # what the LLM server can generate at once
+LLM_ADMISSION_MAX_QUEUE = int(os.environ.get("LLM_ADMISSION_MAX_QUEUE", 20))  # beyond this, chats are rejected as busy
+LLM_ADMISSION_MAX_PER_CLIENT = int(os.environ.get("LLM_ADMISSION_MAX_PER_CLIENT", 2))  # active + queued chats per user/IP
+LLM_ADMISSION_QUEUE_TIMEOUT = int(os.environ.get("LLM_ADMISSION_QUEUE_TIMEOUT", 120))  # give up with queue_timeout
+LLM_ADMISSION_POLL_INTERVAL = float(os.environ.get("LLM_ADMISSION_POLL_INTERVAL", 0.5))  # how often queued chats re-poll
+
+# Outbound HTTP (national_park_explorer/http_client.py); callers may pass their own timeout
+HTTP_CLIENT_POOL_SIZE = int(os.environ.get("HTTP_CLIENT_POOL_SIZE", 10))  # keep-alive connections per host
+HTTP_CLIENT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CLIENT_CONNECT_TIMEOUT", 5))
+HTTP_CLIENT_READ_TIMEOUT = float(os.environ.get("HTTP_CLIENT_READ_TIMEOUT", 30))
+HTTP_CLIENT_RETRIES = int(os.environ.get("HTTP_CLIENT_RETRIES", 2))
+HTTP_CLIENT_BACKOFF = float(os.environ.get("HTTP_CLIENT_BACKOFF", 0.5))  # seconds, doubled per retry, plus jitter
+
+# Cache
+# Defaults to a per-process LocMemCache. Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (Redis, Memcached, database) so version keys and shared cache
+# tiers are seen by every gunicorn worker and management command.
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+
 AUTH_USER_MODEL = 'national_park_explorer.CustomUser'
 
 # Password validation